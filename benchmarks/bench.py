@@ -0,0 +1,221 @@
+"""Benchmarks for searching, building the database, and starting up.
+
+Run with ``hatch run bench`` (or ``python benchmarks/bench.py``).  Save a
+baseline with ``--save baseline.json`` and check a later run against it
+with ``--compare baseline.json``.  Everything runs offline.
+"""
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+QUERIES = {
+    "short": ["a", "x", "he", "sp", "ar"],
+    "long": [
+        "sparkles",
+        "heart",
+        "latin small letter e",
+        "face with tears",
+        "rightwards arrow",
+        "box drawings light",
+    ],
+    "non-ascii": ["é", "✨", "€", "café", "日"],
+    "no match": ["zzzz", "qqxq", "sparklesx", "no such character"],
+    "exact": [
+        "U+2728",
+        "0x1F600",
+        "\\u2728",
+        "\\N{SPARKLES}",
+        "&hearts;",
+        "&#10024;",
+    ],
+}
+TYPED = ["sparkles", "thumbs up", "latin small letter a with grave", "em dash"]
+
+
+def percentiles(samples):
+    """Return p50/p95/p99 (in milliseconds) for samples in seconds."""
+    samples = [sample * 1000 for sample in samples]
+    if len(samples) == 1:
+        samples = samples * 2
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50": cuts[49],
+        "p95": cuts[94],
+        "p99": cuts[98],
+        "n": len(samples),
+    }
+
+
+def time_calls(function, arguments, repeat):
+    samples = []
+    for _ in range(repeat):
+        for argument in arguments:
+            start = time.perf_counter()
+            function(argument)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_search(repeat):
+    from utf import SearchSession, find_character
+    find_character("warm up")
+    results = {}
+    for category, queries in QUERIES.items():
+        samples = time_calls(find_character, queries, repeat)
+        results[f"find_character[{category}]"] = percentiles(samples)
+    # Type each query one key at a time, as the TUI's search session sees it
+    samples = []
+    for _ in range(repeat):
+        session = SearchSession()
+        for text in TYPED:
+            prefixes = [text[:i] for i in range(1, len(text) + 1)]
+            samples += time_calls(session.find, prefixes, 1)
+    results["SearchSession.find[typing]"] = percentiles(samples)
+    return results
+
+
+def bench_build(repeat):
+    from utf.generate_db import make_database
+    samples = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "utf8.db"
+        for _ in range(repeat):
+            start = time.perf_counter()
+            make_database(path)
+            samples.append(time.perf_counter() - start)
+        size = path.stat().st_size
+    return {
+        "make_database": percentiles(samples),
+        "database size (MB)": {"value": size / 1024 / 1024},
+    }
+
+
+def bench_import(repeat):
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import utf"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stderr
+        # The last line is the package itself, cumulative time in µs
+        cumulative = output.strip().splitlines()[-1].split("|")[1]
+        samples.append(int(cumulative) / 1_000_000)
+    return {"import utf": percentiles(samples)}
+
+
+def bench_keystrokes(repeat):
+    from utf import find_character
+    from utf.tui import UnicodeApp
+
+    expected = {
+        text[:i]: find_character(text[:i])
+        for text in TYPED
+        for i in range(1, len(text) + 1)
+    }
+
+    async def type_queries():
+        samples = []
+        app = UnicodeApp()
+        async with app.run_test(size=(160, 50)) as pilot:
+            await pilot.pause()
+            for text in TYPED:
+                for character in text:
+                    start = time.perf_counter()
+                    await pilot.press(character)
+                    value = app.query_one("SearchBox").value
+                    while app.results != expected[value]:
+                        await pilot.pause(0.001)
+                    await pilot.pause()  # Let the new results render
+                    samples.append(time.perf_counter() - start)
+                await pilot.press("ctrl+l")
+                await pilot.pause()
+        return samples
+
+    samples = []
+    for _ in range(repeat):
+        samples += asyncio.run(type_queries())
+    return {"keystroke to render": percentiles(samples)}
+
+
+BENCHMARKS = {
+    "search": bench_search,
+    "build": bench_build,
+    "import": bench_import,
+    "keystrokes": bench_keystrokes,
+}
+
+
+def print_results(results, baseline, threshold):
+    """Print results next to the baseline; return True on regressions."""
+    regressed = False
+    for name, stats in results.items():
+        old = baseline.get(name, {})
+        parts = []
+        for key, value in stats.items():
+            if key == "n":
+                continue
+            part = f"{key} {value:9.2f}"
+            if key in old and old[key]:
+                change = (value - old[key]) / old[key] * 100
+                flag = ""
+                if change > threshold:
+                    flag = " !"
+                    regressed = True
+                part += f" ({change:+6.1f}%{flag})"
+            parts.append(part)
+        print(f"{name:<36}" + "  ".join(parts))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", type=Path, help="write results to a file")
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        help="compare against results saved with --save",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10,
+        help="percent slowdown vs. the baseline to count as a regression",
+    )
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+    results = {}
+    for name in args.benchmarks or BENCHMARKS:
+        # The build is slow, so it isn't repeated as often as the rest
+        repeat = max(1, args.repeat // 2) if name == "build" else args.repeat
+        results.update(BENCHMARKS[name](repeat))
+    baseline = json.loads(args.compare.read_text()) if args.compare else {}
+    regressed = print_results(results, baseline, args.threshold)
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2) + "\n")
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Generate the character database into the wheel at build time."""
+import importlib.util
+from pathlib import Path
+import shutil
+import tempfile
+
+from hatchling.builders.hooks.plugin.interface import BuildHookInterface
+
+
+class CustomBuildHook(BuildHookInterface):
+
+    def initialize(self, version, build_data):
+        if self.target_name != "wheel":
+            return
+        # Load generate_db on its own: importing the utf package would
+        # pull in the application's runtime dependencies
+        module_path = Path(self.root) / "utf" / "generate_db.py"
+        spec = importlib.util.spec_from_file_location("generate_db", module_path)
+        generate_db = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(generate_db)
+        # Built outside the output directory, so it doesn't end up next
+        # to the wheel (and get uploaded with it)
+        self.build_directory = tempfile.mkdtemp()
+        path = Path(self.build_directory) / generate_db.prebuilt_name
+        generate_db.make_database(path)
+        build_data["force_include"][str(path)] = f"utf/{path.name}"
+
+    def finalize(self, version, build_data, artifact_path):
+        if self.target_name != "wheel":
+            return
+        shutil.rmtree(self.build_directory, ignore_errors=True)
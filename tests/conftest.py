@@ -0,0 +1,20 @@
+# SPDX-FileCopyrightText: 2024-present Trey Hunner <trey@treyhunner.com>
+#
+# SPDX-License-Identifier: MIT
+import os
+import shutil
+import tempfile
+
+# utf's paths are worked out when it's imported, so they're pointed at a
+# scratch directory before any test imports it.  That keeps tests from
+# building the real cache, touching the real copy history (which would
+# also change how results rank) or talking to a running utf serve.
+home = tempfile.mkdtemp(prefix="utf-tests-")
+for name in ("XDG_CACHE_HOME", "XDG_DATA_HOME", "XDG_RUNTIME_DIR"):
+    os.environ[name] = os.path.join(home, name.lower())
+for name in ("UTF_LOCALES", "UTF_PROFILE"):
+    os.environ.pop(name, None)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(home, ignore_errors=True)
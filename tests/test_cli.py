@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: 2024-present Trey Hunner <trey@treyhunner.com>
+#
+# SPDX-License-Identifier: MIT
+import io
+
+import pytest
+
+from utf import cli
+
+
+def scan(text):
+    """Find unusual characters one character at a time."""
+    found = []
+    line = column = 1
+    for character in text:
+        if cli.UNUSUAL.match(character):
+            found.append(((line, column), character))
+        if character == "\n":
+            line, column = line + 1, 1
+        else:
+            column += 1
+    return found
+
+
+TEXTS = [
+    "plain ascii\nonly\n",
+    "café\nnaïve ✨\n",
+    "a\u200bb\tc\r\n\x00\x1b[0m\n",
+    "\n".join("x" * n + "é" for n in range(40)),
+    "✨" * 30 + "\n" + "😀 " * 30,
+    "\ufeffstart\n\n\nend\u202e",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64 * 1024])
+def test_find_unusual(monkeypatch, text, chunk_size):
+    monkeypatch.setattr(cli, "CHUNK_SIZE", chunk_size)
+    file = io.BytesIO(text.encode())
+    assert list(cli.find_unusual(file)) == scan(text)
+
+
+def test_invalid_utf8(monkeypatch):
+    monkeypatch.setattr(cli, "CHUNK_SIZE", 2)
+    file = io.BytesIO(b"ab\xffc\nd\xe2\x9c")
+    assert list(cli.find_unusual(file)) == [
+        ((1, 3), "\ufffd"),
+        ((2, 2), "\ufffd"),
+    ]
+
+
+def test_unnamed_characters():
+    assert cli.describe_character("\x01")[5] == ""
+    assert cli.describe_character("é")[5] == r"\N{latin small letter e with acute}"
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_inspect(tmp_path, capfd, jobs):
+    first, second = tmp_path / "first.txt", tmp_path / "second.txt"
+    first.write_text("a​b\n", encoding="utf-8")
+    second.write_text("ok\n✨\n", encoding="utf-8")
+    output = io.StringIO()
+    paths = [str(first), str(second)]
+    assert cli.inspect(paths, "tsv", jobs, output)
+    lines = [line.split("\t")[:4] for line in output.getvalue().splitlines()]
+    assert lines == [
+        [str(first), "1", "2", "​"],
+        [str(second), "2", "1", "✨"],
+    ]
+    missing = str(tmp_path / "missing.txt")
+    assert not cli.inspect([*paths, missing], "tsv", jobs, io.StringIO())
+    assert "missing.txt" in capfd.readouterr().err
@@ -0,0 +1,91 @@
+# SPDX-FileCopyrightText: 2024-present Trey Hunner <trey@treyhunner.com>
+#
+# SPDX-License-Identifier: MIT
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from utf import daemon
+
+
+@pytest.fixture(scope="module")
+def client():
+    """A client of a daemon running in its own process."""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "utf", "serve"], stdout=subprocess.DEVNULL
+    )
+    try:
+        for _ in range(100):
+            client = daemon.connect()
+            if client is not None or server.poll() is not None:
+                break
+            time.sleep(0.1)
+        assert client is not None, "the daemon didn't start"
+        yield client
+        client.close()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=10)
+
+
+@pytest.fixture
+def listener(tmp_path, monkeypatch):
+    """A socket in the daemon's place that accepts but never answers."""
+    tmp_path.chmod(0o700)
+    path = tmp_path / "utf.sock"
+    monkeypatch.setattr(daemon, "socket_path", path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(path))
+        server.listen()
+        yield server
+
+
+def test_is_private(tmp_path):
+    tmp_path.chmod(0o700)
+    assert daemon.is_private(tmp_path)
+    tmp_path.chmod(0o755)
+    assert not daemon.is_private(tmp_path)
+    assert not daemon.is_private(tmp_path / "missing")
+
+
+def test_connect_refuses_shared_directory(listener, tmp_path):
+    tmp_path.chmod(0o777)
+    assert daemon.connect() is None
+
+
+def test_unresponsive_daemon_times_out(listener, monkeypatch):
+    monkeypatch.setattr(daemon, "TIMEOUT", 0.1)
+    client = daemon.connect()
+    assert client is not None
+    assert client.find("heart") is None
+    assert client.connection is None
+
+
+def test_find(client):
+    results = client.find("snowman")
+    assert "☃" in [row.glyph for row in results]
+    assert results == client.find("snowman")
+
+
+def test_copies_are_shared(client):
+    assert client.record("snowman without snow", "⛄") is True
+    assert client.record("snowman without snow", "⛄") is True
+    assert client.history()[0].glyph == "⛄"
+    other = daemon.connect()
+    assert other.history()[0].glyph == "⛄"
+    other.close()
+
+
+@pytest.mark.parametrize("query", ["tab\there", "new\nline", "\ud83d"])
+def test_unsendable_queries(client, query):
+    assert client.find(query) is None
+    assert client.connection is not None  # Still usable afterwards
+    assert client.find("snowman")
+
+
+def test_unknown_command(client):
+    assert client.request("nonsense") == {"error": "unknown command: nonsense"}
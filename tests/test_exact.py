@@ -0,0 +1,72 @@
+# SPDX-FileCopyrightText: 2024-present Trey Hunner <trey@treyhunner.com>
+#
+# SPDX-License-Identifier: MIT
+import pytest
+
+from utf import find_character, parse_exact
+
+
+@pytest.mark.parametrize("query, text", [
+    ("U+2728", "✨"),
+    ("u+2728", "✨"),
+    ("0x1F600", "😀"),
+    ("U+48 U+69", "Hi"),
+    ("\\u2728", "✨"),
+    ("\\U0001F600", "😀"),
+    ("\\x41", "A"),
+    ("\\N{SPARKLES}", "✨"),
+    ("&hearts;", "♥"),
+    ("&#10024;", "✨"),
+    ("&#x2728;", "✨"),
+    ("&lt;&gt;", "<>"),
+    ("  U+2728  ", "✨"),
+    ("U+48  0x69", "Hi"),
+])
+def test_spelled_out(query, text):
+    assert parse_exact(query) == text
+
+
+@pytest.mark.parametrize("query", [
+    "U+D800",
+    "0xDFFF",
+    "U+41 U+DC00",
+    "\\ud800",
+    "\\udfff",
+    "a\udc80b",
+])
+def test_surrogates(query):
+    assert parse_exact(query) is None
+
+
+@pytest.mark.parametrize("query", [
+    "&notanentity;",
+    "&hearts;&bogus;",
+    "\\N{NO SUCH CHARACTER}",
+    "U+110000",
+    "sparkles",
+    "U+",
+    "U+48U+69",
+    "0x410x42",
+    "U+48U+6",
+    "a",
+    "7",
+])
+def test_not_exact(query):
+    assert parse_exact(query) is None
+
+
+def test_literal_text():
+    assert parse_exact("✨") == "✨"
+    assert parse_exact("é") == "é"
+    assert parse_exact("?") == "?"
+    assert parse_exact("→ ←") == "→ ←"
+
+
+def test_words_only_literal_when_asked():
+    assert parse_exact("café") is None
+    assert parse_exact("café", literal=True) == "café"
+
+
+@pytest.mark.parametrize("query", ["U+48U+69", "0x410x42", "U+48U+6"])
+def test_run_together_code_points_are_searched(query):
+    assert find_character(query) == []
@@ -0,0 +1,230 @@
+# SPDX-FileCopyrightText: 2024-present Trey Hunner <trey@treyhunner.com>
+#
+# SPDX-License-Identifier: MIT
+from contextlib import closing
+import json
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from utf import generate_db
+from utf.generate_db import (
+    SCHEMA_VERSION,
+    building,
+    get_locales,
+    get_source_stamps,
+    is_current,
+    make_database,
+    make_history_database,
+    update_database,
+    update_shard,
+)
+
+
+@pytest.fixture(scope="session")
+def reference(tmp_path_factory):
+    path = tmp_path_factory.mktemp("reference") / "utf8.db"
+    make_database(path)
+    return path
+
+
+@pytest.fixture
+def database(reference, tmp_path):
+    """A copy of a freshly built reference database."""
+    path = tmp_path / "utf8.db"
+    shutil.copy(reference, path)
+    return path
+
+
+def change(path, *statements):
+    with closing(sqlite3.connect(path)) as db, db:
+        for statement in statements:
+            db.execute(statement)
+
+
+def get_history(path):
+    with closing(sqlite3.connect(path)) as db:
+        return dict(db.execute("SELECT glyph, copies FROM copied"))
+
+
+def get_stamps(path):
+    with closing(sqlite3.connect(path)) as db:
+        return dict(db.execute("SELECT name, stamp FROM sources"))
+
+
+def unsupported_link(source, target):
+    raise PermissionError(1, "Operation not permitted")
+
+
+@pytest.mark.parametrize("link", [os.link, unsupported_link])
+def test_building_without_replace(tmp_path, monkeypatch, link):
+    monkeypatch.setattr(os, "link", link)
+    path = tmp_path / "history.db"
+    with building(path, replace=False) as build_path:
+        build_path.write_text("first")
+    with building(path, replace=False) as build_path:
+        build_path.write_text("second")
+    assert path.read_text() == "first"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_building_replaces(tmp_path):
+    path = tmp_path / "symbols.db"
+    for text in ["first", "second"]:
+        with building(path) as build_path:
+            build_path.write_text(text)
+    assert path.read_text() == "second"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_current_database_is_left_alone(database):
+    assert is_current(database)
+    before = database.stat()
+    update_database(database)
+    after = database.stat()
+    assert (after.st_ino, after.st_mtime_ns) == (
+        before.st_ino,
+        before.st_mtime_ns,
+    )
+
+
+def test_touched_sources_are_restamped(database):
+    change(database, "UPDATE sources SET stamp = '0:0'")
+    inode = database.stat().st_ino
+    update_database(database)
+    assert get_stamps(database) == get_source_stamps()
+    assert database.stat().st_ino != inode  # Replaced, not changed in place
+    assert is_current(database)
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "UPDATE sources SET stamp = '0:0', hash = 'stale'",
+        f"PRAGMA user_version = {SCHEMA_VERSION - 1}",
+    ],
+)
+def test_stale_database_is_replaced(database, statement):
+    change(database, statement, "DELETE FROM symbols")
+    assert not is_current(database)
+    update_database(database)
+    assert is_current(database)
+    with closing(sqlite3.connect(database)) as db:
+        assert db.execute("SELECT count(*) FROM symbols").fetchone()[0]
+
+
+@pytest.fixture
+def legacy(database):
+    """A database from before copy history had its own file."""
+    change(
+        database,
+        "PRAGMA user_version = 4",
+        """
+        CREATE TABLE copied (
+            glyph TEXT PRIMARY KEY,
+            copies INTEGER,
+            last_copied DATETIME
+        )
+        """,
+        "INSERT INTO copied VALUES ('☃', 3, '2024-01-01 00:00:00')",
+        "INSERT INTO copied VALUES ('一', 1, '2024-01-02 00:00:00')",
+    )
+    return database
+
+
+def test_legacy_history_is_moved(legacy, tmp_path, monkeypatch):
+    history_path = tmp_path / "data" / "history.db"
+    monkeypatch.setattr(generate_db, "history_path", history_path)
+    update_database(legacy)
+    assert get_history(history_path) == {"☃": 3, "一": 1}
+    assert is_current(legacy)
+    with closing(sqlite3.connect(legacy)) as db:
+        query = "SELECT 1 FROM sqlite_schema WHERE name = 'copied'"
+        assert db.execute(query).fetchone() is None
+
+
+def test_existing_history_is_kept(legacy, tmp_path, monkeypatch):
+    history_path = tmp_path / "data" / "history.db"
+    make_history_database(history_path)
+    history = get_history(history_path)
+    monkeypatch.setattr(generate_db, "history_path", history_path)
+    update_database(legacy)
+    assert get_history(history_path) == history
+    assert "一" not in history
+
+
+@pytest.fixture
+def locales(tmp_path, monkeypatch):
+    path = tmp_path / "locales"
+    path.mkdir()
+    monkeypatch.setattr(generate_db, "locales_path", path)
+    return path
+
+
+def get_keywords(path):
+    with closing(sqlite3.connect(path)) as db:
+        return set(db.execute("SELECT keyword, glyph FROM keywords"))
+
+
+def test_get_locales(monkeypatch):
+    monkeypatch.setenv("UTF_LOCALES", "de, en fr,en-US")
+    assert get_locales() == ["de", "fr"]
+    monkeypatch.delenv("UTF_LOCALES")
+    assert get_locales() == []
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"☃": ["schnee_mann", "Winter"]},
+        {
+            "annotations": {
+                "annotations": {
+                    "☃": {"default": ["Schnee mann"], "tts": ["winter"]},
+                },
+            },
+        },
+    ],
+)
+def test_shard_is_built(locales, tmp_path, data):
+    (locales / "de.json").write_text(json.dumps(data))
+    path = update_shard("de", tmp_path / "keywords-de.db")
+    assert get_keywords(path) == {("schnee mann", "☃"), ("winter", "☃")}
+
+
+def test_shard_is_only_rebuilt_when_changed(locales, tmp_path):
+    source = locales / "de.json"
+    source.write_text(json.dumps({"☃": ["schneemann"]}))
+    path = update_shard("de", tmp_path / "keywords-de.db")
+    inode = path.stat().st_ino
+    assert update_shard("de", path) == path
+    assert path.stat().st_ino == inode
+    source.write_text(json.dumps({"⛄": ["schneemann ohne schnee"]}))
+    assert update_shard("de", path) == path
+    assert get_keywords(path) == {("schneemann ohne schnee", "⛄")}
+
+
+def test_unreadable_shard_is_rebuilt(locales, tmp_path):
+    (locales / "de.json").write_text(json.dumps({"☃": ["schneemann"]}))
+    path = tmp_path / "keywords-de.db"
+    path.write_text("not a database")
+    assert update_shard("de", path) == path
+    assert get_keywords(path) == {("schneemann", "☃")}
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["not json", "[]", '{"☃": "schneemann"}', '{"annotations": []}'],
+)
+def test_broken_locale_is_skipped(locales, tmp_path, capsys, text):
+    (locales / "de.json").write_text(text)
+    assert update_shard("de", tmp_path / "keywords-de.db") is None
+    assert capsys.readouterr().err.startswith("utf: skipping locale de: ")
+
+
+def test_missing_locale_is_skipped(locales, tmp_path):
+    assert update_shard("xx", tmp_path / "keywords-xx.db") is None
+    (locales / "xx.json").write_text("{}")
+    assert update_shard("xx", tmp_path / "keywords-xx.db") is None
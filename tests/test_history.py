@@ -0,0 +1,66 @@
+# SPDX-FileCopyrightText: 2024-present Trey Hunner <trey@treyhunner.com>
+#
+# SPDX-License-Identifier: MIT
+from contextlib import closing
+import sqlite3
+
+import pytest
+
+from utf import CopyHistory, get_db
+from utf.generate_db import db_path, make_history_database, reference_uri
+
+
+@pytest.fixture
+def history_path(tmp_path):
+    path = tmp_path / "history.db"
+    make_history_database(path)
+    return path
+
+
+@pytest.fixture
+def connection(history_path):
+    get_db()  # Builds the reference database if needed
+    db = sqlite3.connect(history_path)
+    db.execute("ATTACH ? AS reference", (reference_uri(db_path),))
+    yield db
+    db.close()
+
+
+def get_copies(path, glyph):
+    with closing(sqlite3.connect(path)) as db:
+        row = db.execute(
+            "SELECT copies FROM copied WHERE glyph = ?", (glyph,)
+        ).fetchone()
+    return row and row[0]
+
+
+def test_copies_are_ranked_before_they_are_written(connection, history_path):
+    history = CopyHistory(connection)
+    history.record("snowman", "☃")
+    history.record("snowman", "☃")
+    assert history.ranked[0].glyph == "☃"
+    assert history.copies["☃"] == 2
+    assert get_copies(history_path, "☃") is None
+    history.flush()
+    assert get_copies(history_path, "☃") == 2
+    history.record("snowman", "☃")
+    history.flush()
+    assert get_copies(history_path, "☃") == 3
+
+
+def test_flushed_history_is_loaded(connection):
+    history = CopyHistory(connection)
+    history.record("snowman", "☃")
+    for _ in range(2):
+        history.record("cjk unified ideograph-4e00", "一")
+    history.flush()
+    loaded = CopyHistory(connection)
+    assert loaded.ranked == history.ranked
+    assert loaded.ranked[0].title == "Cjk Unified Ideograph-4E00"
+
+
+def test_flush_without_copies(connection, history_path):
+    history = CopyHistory(connection)
+    before = history_path.stat().st_mtime_ns
+    history.flush()
+    assert history_path.stat().st_mtime_ns == before
@@ -0,0 +1,48 @@
+# SPDX-FileCopyrightText: 2024-present Trey Hunner <trey@treyhunner.com>
+#
+# SPDX-License-Identifier: MIT
+import unicodedata
+
+import pytest
+
+from utf import get_db, ranges
+
+
+def get_ranges():
+    return get_db().execute("SELECT first, last, prefix FROM ranges").fetchall()
+
+
+def test_names_match_unicodedata():
+    for first, last, prefix in get_ranges():
+        for code_point in range(first, last + 1):
+            expected = unicodedata.name(chr(code_point), None)
+            if expected is None:
+                continue  # Newer than this Python's Unicode data
+            name = ranges.get_name(prefix, code_point)
+            assert name == expected.lower()
+
+
+@pytest.mark.parametrize("query", [
+    "cjk",
+    "4e0",
+    "ideograph-4e0",
+    "-9fa",
+    "fff",
+    "hangul syllable g",
+    "gag",
+    "ssyu",
+    "b",
+    "17",
+    "zzz",
+])
+@pytest.mark.parametrize("start", [0, 0xAC10, 0x9F00, 0x18000])
+def test_find_matches_scan(query, start):
+    limit = 50
+    for first, last, prefix in get_ranges():
+        expected = [
+            code_point
+            for code_point in range(max(first, start), last + 1)
+            if query in ranges.get_name(prefix, code_point)
+        ][:limit]
+        found = ranges.find(query, first, last, prefix, limit, start)
+        assert found == expected, (query, hex(first), prefix)
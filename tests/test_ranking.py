@@ -0,0 +1,31 @@
+# SPDX-FileCopyrightText: 2024-present Trey Hunner <trey@treyhunner.com>
+#
+# SPDX-License-Identifier: MIT
+import pytest
+
+from utf.ranking import get_distance
+
+
+@pytest.mark.parametrize("query, text, distance", [
+    ("heart", "heart", 0),
+    ("heart", "red heart", 0),
+    ("hart", "heart", 1),
+    ("heaart", "heart", 1),
+    ("haert", "heart", 1),
+    ("smiel", "smile", 1),
+    ("sparkels", "sparkles", 1),
+    ("sprakels", "sparkles", 2),
+    ("hxaxt", "heart", 2),
+])
+def test_distance(query, text, distance):
+    assert get_distance(query, text, 2) == distance
+
+
+def test_over_limit():
+    assert get_distance("hxaxt", "heart", 1) is None
+    assert get_distance("zzzz", "heart", 2) is None
+
+
+def test_substring_is_free():
+    assert get_distance("arrow", "leftwards arrow with hook", 0) == 0
+    assert get_distance("arow", "leftwards arrow with hook", 1) == 1
@@ -0,0 +1,66 @@
+# SPDX-FileCopyrightText: 2024-present Trey Hunner <trey@treyhunner.com>
+#
+# SPDX-License-Identifier: MIT
+import pytest
+
+from utf import Row, find_character, get_db, get_rows, make_row
+from utf.generate_db import get_display_columns
+
+
+@pytest.mark.parametrize(
+    "name, glyph, columns",
+    [
+        ("snowman", "☃", (
+            "Snowman",
+            "2603",
+            "&#9731;",
+            r"\u2603",
+            r"\N{snowman}",
+        )),
+        ("black heart suit", "♥", (
+            "Black Heart Suit",
+            "2665",
+            "&hearts;",
+            r"\u2665",
+            r"\N{black heart suit}",
+        )),
+        ("smiling face with heart-shaped eyes", "😍", (
+            "Smiling Face With Heart-Shaped Eyes",
+            "0001F60D",
+            "&#128525;",
+            r"\U0001f60d",
+            r"\N{smiling face with heart-shaped eyes}",
+        )),
+        ("red heart", "❤️", (
+            "Red Heart",
+            "",
+            "&#10084;&#65039;",
+            r"\u2764\ufe0f",
+            r"\N{HEAVY BLACK HEART}\N{VARIATION SELECTOR-16}",
+        )),
+        ("", "\x00", ("", "0000", "&#0;", r"\x00", "")),
+    ],
+)
+def test_display_columns(name, glyph, columns):
+    assert get_display_columns(name, glyph) == columns
+
+
+def test_stored_columns_match():
+    rows = get_db().execute("""
+        SELECT name, glyph, title, code, entity, unicode_escape,
+            named_escape
+        FROM symbols
+    """)
+    for row in map(Row._make, rows):
+        assert row == make_row(row.name, row.glyph)
+
+
+def test_rows_outside_the_database():
+    results = [("snowman", "☃"), ("cjk unified ideograph-4e00", "一")]
+    assert get_rows(results) == [make_row(*result) for result in results]
+
+
+def test_search_results_are_rows():
+    results = find_character("snowman")
+    assert all(isinstance(row, Row) for row in results)
+    assert make_row("snowman", "☃") in results
@@ -0,0 +1,42 @@
+# SPDX-FileCopyrightText: 2024-present Trey Hunner <trey@treyhunner.com>
+#
+# SPDX-License-Identifier: MIT
+import pytest
+
+from utf import SearchSession, find_character, find_pages
+
+
+TYPED = [
+    "sparkles",
+    "thumbs up",
+    "latin small letter a with grave",
+    "hangul syllable gag",
+    "arrow",
+    "sparkels",
+    "café",
+    "U+2728",
+]
+
+
+@pytest.mark.parametrize("text", TYPED)
+def test_session_matches_find_character(text):
+    session = SearchSession()
+    prefixes = [text[:i] for i in range(1, len(text) + 1)]
+    for query in prefixes + prefixes[::-1]:
+        assert session.find(query) == find_character(query), query
+
+
+def test_session_pages_match_find_pages():
+    session = SearchSession()
+    session.find("arr")
+    assert list(session.pages("arrow")) == list(find_pages("arrow"))
+
+
+def test_pages_are_unique():
+    glyphs = [row.glyph for page in find_pages("arrow") for row in page]
+    assert len(glyphs) == len(set(glyphs))
+
+
+def test_exact_matches_first():
+    assert find_character("U+2728")[0].glyph == "✨"
+    assert find_character("U+D800") == []
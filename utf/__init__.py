@@ -1,277 +1,712 @@
-from html.entities import codepoint2name
-import importlib.resources
-import unicodedata
+import atexit
+from bisect import bisect_right
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+from functools import cache
+import html
+from html.entities import html5
+import re
 import sqlite3
+import sys
+import threading
+import unicodedata
 
-from darkdetect import isDark as is_dark, listener as dark_toggle_listener
-import pyperclip
-from textual.app import App, ComposeResult
-from textual.binding import Binding
-from textual.containers import Container, VerticalScroll
-from textual.message import Message
-from textual.reactive import reactive
-from textual.widget import Widget
-from textual.widgets import Button, Footer, Header, Input, Static
-
-from .generate_db import make_database, db_path
+from . import ranges, ranking, startup, timings
+from .generate_db import (
+    db_path,
+    get_code_point,
+    get_display_columns,
+    get_escape,
+    get_html_entity,
+    get_locales,
+    get_named_escape,
+    history_path,
+    install_database,
+    make_history_database,
+    reference_uri,
+    update_database,
+    update_shard,
+)
 
 
 __version__ = "0.3.3"
 
-if not db_path.exists():
-    make_database()
-db = sqlite3.connect(db_path)
-
-
-def find_character(query):
-    where = "keyword LIKE ?"
-    variables = [f"%{query}%"]
-    if len(query) == 1 or any(ord(c) > 127 for c in query):
-        where += " OR symbols.glyph LIKE ?"
-        variables += variables
-    cursor = db.execute(f"""
-        SELECT DISTINCT symbols.name, symbols.glyph
-        FROM keywords
-        INNER JOIN symbols ON keywords.glyph = symbols.glyph
-        WHERE {where}
-        ORDER BY -symbols.priority
-        LIMIT 100
-    """, variables)
-    copied_before = set(get_character_cache())
-    results = [
-        (name, glpyh)
-        for name, glpyh in cursor.fetchall()
-    ]
-    return sorted(results, key=lambda r: r not in copied_before)
-
 
-def increment_copy_count(name, glyph):
-    db.execute("""
-        INSERT INTO copied (glyph, copies, last_copied)
-        VALUES (
-            ?,
-            1,
-            datetime('now')
-        )
-        ON CONFLICT(glyph) DO UPDATE SET
-            copies = copies + 1,
-            last_copied = datetime('now')
-    """, (glyph,))
-    db.commit()
+# The reference database is read through memory-mapped I/O
+MMAP_SIZE = 256 * 1024 * 1024
 
 
-def get_character_cache():
-    cursor = db.execute("""
-        SELECT symbols.name, copied.glyph
-        FROM copied
-        INNER JOIN symbols
-        ON symbols.glyph = copied.glyph
-        ORDER BY -copies, -last_copied
-    """)
-    return [
-        (name, glyph)
-        for name, glyph in cursor.fetchall()
-    ]
-
+def connect_reference(**kwargs):
+    db = sqlite3.connect(reference_uri(db_path), uri=True, **kwargs)
+    db.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    attach_shards(db)
+    return db
 
-class SmartScroll(VerticalScroll, can_focus=False):
-    def watch_show_vertical_scrollbar(self):
-        self.can_focus = self.show_vertical_scrollbar
 
+@cache
+def get_shards():
+    """Return {schema name: path} for the configured locales' shards.
+
+    Shards are built (or rebuilt) here if they need to be.  With no extra
+    locales configured there are none, and searches only query the
+    reference database.
+    """
+    paths = filter(None, map(update_shard, get_locales()))
+    return {f"shard{number}": path for number, path in enumerate(paths, 1)}
 
-class Result(Widget):
 
-    __slots__ = ("name", "character")
+def attach_shards(db):
+    """Attach every keyword shard to the reference database connection db."""
+    for schema, path in get_shards().items():
+        db.execute(f"ATTACH ? AS {schema}", (reference_uri(path),))
+        db.execute(f"PRAGMA {schema}.mmap_size = {MMAP_SIZE}")
 
-    BINDINGS = [
-        ("c", "copy_code", "Copy code point"),
-        ("enter", "copy_character", "Copy character"),
-        ("h", "copy_html_entity", "Copy HTML entity"),
-        ("n", "copy_name", "Copy name"),
+
+def get_tables(name):
+    """Return the names of table name in the reference database and shards."""
+    return [name, *(f"{schema}.{name}" for schema in get_shards())]
+
+
+@cache
+def get_db():
+    """Return the (read-only) connection to the reference database.
+
+    The database is created first if needed, and rebuilt if it's out of
+    date.  Any number of utf processes can read it without locking.
+    """
+    if not db_path.exists():
+        install_database()
+    update_database()
+    db = connect_reference()
+    startup.mark("open database")
+    return db
+
+
+@cache
+def get_search_db():
+    """Return the connection used by background searches.
+
+    Searches run in worker threads on their own connection, so a slow
+    query never blocks the UI and can be interrupted by the next one.
+    """
+    get_db()
+    return connect_reference(check_same_thread=False)
+
+
+@cache
+def get_history_db():
+    """Return the connection to the copy history database.
+
+    It's the only database utf writes to, and it lives in the user data
+    directory so clearing the cache keeps it.  The reference database is
+    attached to it (as reference) for queries that need both.
+    """
+    get_db()
+    if not history_path.exists():
+        make_history_database()
+    db = sqlite3.connect(history_path.as_uri(), uri=True)
+    # WAL lets other utf processes read history while copies are written,
+    # and with it synchronous=NORMAL only syncs at checkpoints
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    db.execute("ATTACH ? AS reference", (reference_uri(db_path),))
+    return db
+
+
+search_lock = threading.Lock()
+
+# LIKE only folds the case of ASCII letters
+ascii_lowercase = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    "abcdefghijklmnopqrstuvwxyz",
+)
+
+
+def matches_glyphs(query):
+    """Return True if query should also be matched against the glyphs."""
+    return len(query) == 1 or any(ord(c) > 127 for c in query)
+
+
+# Queries that spell out characters exactly rather than describe them
+CODE_POINT = re.compile(r"(?:U\+|0x)([0-9A-F]{1,6})", re.IGNORECASE)
+CODE_POINTS = re.compile(
+    f"{CODE_POINT.pattern}(?:\\s+{CODE_POINT.pattern})*", re.IGNORECASE
+)
+ESCAPES = re.compile(
+    r"(?:\\(?:x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|N\{[^}]+\}))+"
+)
+ENTITY = re.compile(r"&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);")
+ENTITIES = re.compile(f"(?:{ENTITY.pattern})+")
+SURROGATES = re.compile("[\ud800-\udfff]")
+
+
+def parse_exact(query, literal=False):
+    """Return the text that query spells out exactly, or None.
+
+    That's code points (U+2728 or 0x2728), Python escapes (\\u2728 or
+    \\N{sparkles}), HTML entities (&hearts; or &#10024;) and literal text:
+    a single symbol or non-ASCII character, or non-ASCII text without
+    letters.  Non-ASCII words (like café) are only taken literally if
+    literal is True, since they're usually keywords.
+    """
+    text = parse_text(query.strip(), literal)
+    # Lone surrogates aren't characters, and can't be encoded as UTF-8
+    if text and SURROGATES.search(text):
+        return None
+    return text
+
+
+def parse_text(query, literal=False):
+    if CODE_POINTS.fullmatch(query):
+        code_points = [int(code, 16) for code in CODE_POINT.findall(query)]
+        if max(code_points) > sys.maxunicode:
+            return None
+        return "".join(map(chr, code_points))
+    if ESCAPES.fullmatch(query):
+        try:
+            return query.encode("ascii").decode("unicode_escape")
+        except UnicodeDecodeError:  # Unknown \N{...} name
+            return None
+    if ENTITIES.fullmatch(query):
+        entities = ENTITY.findall(query)
+        # html.unescape leaves unknown entities alone, except for ones that
+        # start with a legacy entity name (&notit; becomes ¬it;)
+        if any(
+            not entity.startswith("&#") and entity[1:] not in html5
+            for entity in entities
+        ):
+            return None
+        return "".join(html.unescape(entity) for entity in entities)
+    if query.isascii():
+        return query if len(query) == 1 and not query.isalnum() else None
+    if len(query) == 1 or literal or not any(c.isalpha() for c in query):
+        return query
+    return None
+
+
+@timings.timed("search sql")
+def find_exact(query, connection=None, literal=False):
+    """Return (name, glyph) for the characters query spells out exactly.
+
+    A multi-character string comes first if it's a character of its own
+    (like an emoji sequence), followed by each of its code points.  Each
+    one is a primary key lookup, so this takes about as long no matter
+    how big the database is.
+    """
+    text = parse_exact(query, literal)
+    if not text:
+        return []
+    connection = connection or get_db()
+    characters = [text] if len(text) > 1 else []
+    characters += dict.fromkeys(text)
+    results = []
+    for character in characters:
+        name = get_name(character, connection)
+        if name:
+            results.append((name, character))
+    return results[:100]
+
+
+def get_name(character, connection=None):
+    """Return the (lowercase) name of character, or None if it has none."""
+    connection = connection or get_db()
+    row = connection.execute(
+        "SELECT name FROM symbols WHERE glyph = ?", (character,)
+    ).fetchone()
+    if row:
+        return row[0]
+    if len(character) != 1:
+        return None
+    name = get_range_name(character, connection)
+    return name or unicodedata.name(character, "").lower() or None
+
+
+# A result, with the text shown for it already formatted
+Row = namedtuple(
+    "Row",
+    "name glyph title code entity unicode_escape named_escape",
+)
+
+
+def make_row(name, glyph):
+    """Return a Row for a character that isn't in the database."""
+    return Row(name, glyph, *get_display_columns(name, glyph))
+
+
+def get_rows(results, connection=None):
+    """Return a Row for each (name, glyph) in results.
+
+    Characters in the database have their display columns looked up in one
+    query; the rest (from the ranges, or found by exact lookups) have them
+    formatted on the spot.
+    """
+    connection = connection or get_db()
+    glyphs = [glyph for _, glyph in results]
+    with timings.timed("search sql"):
+        columns = {
+            glyph: rest
+            for glyph, *rest in connection.execute(f"""
+                SELECT glyph, title, code, entity, unicode_escape,
+                    named_escape
+                FROM symbols
+                WHERE glyph IN ({", ".join("?" * len(glyphs))})
+            """, glyphs)
+        }
+    return [
+        Row(name, glyph, *columns[glyph])
+        if glyph in columns else make_row(name, glyph)
+        for name, glyph in results
     ]
 
-    def __init__(self, name, character):
-        name = name.title()
-        self.name = name
-        self.character = character
-        super().__init__()
-
-    def get_html_entity(self):
-        codes = [ord(c) for c in self.character]
-        return "".join(
-            f"&{codepoint2name.get(c, f'#{c}')};"
-            for c in codes
-        )
 
-    def compose(self):
-        yield Static(self.name, classes="name")
-        code = ""
-        entity = ""
-        if len(self.character) == 1:
-            c = ord(self.character)
-            code = f"{c:X}"
-            code = code.zfill(8 if len(code) > 4 else 4)
-            entity = self.get_html_entity()
-        yield Static(code)
-        yield Static(self.character)
-        yield Static(entity)
-
-    @property
-    def can_focus(self):
-        return True
-
-    def action_copy_code(self):
-        code = self.character.encode("unicode_escape").decode()
-        pyperclip.copy(code)
-        self.notify(f"[green]Copied[/green] {code}")
-        increment_copy_count(self.name, self.character)
-
-    def action_copy_character(self):
-        pyperclip.copy(self.character)
-        self.notify(f"[green]Copied[/green] {self.character}")
-        increment_copy_count(self.name, self.character)
-
-    def action_copy_html_entity(self):
-        html_entity = self.get_html_entity()
-        pyperclip.copy(html_entity)
-        self.notify(f"[green]Copied[/green] {html_entity}")
-        increment_copy_count(self.name, self.character)
-
-    def action_copy_name(self):
-        if len(self.character) == 1:
-            name = r"\N{" + self.name.lower() + r"}"
+LIMIT = 100
+
+# Most candidates checked for typos, those sharing the most trigrams first
+FUZZY_CANDIDATES = 100
+
+
+def find_character(query, connection=None):
+    """Return the first page of matches (as Rows) for query."""
+    return next(find_pages(query, connection))
+
+
+def find_pages(query, connection=None):
+    """Yield pages of matches (as Rows) for query, best first.
+
+    Pages hold up to LIMIT matches, plus any exact matches at the start of
+    the first page.  Each page is only looked up when it's asked for.
+    """
+    if SURROGATES.search(query):
+        return iter([[]])  # Can't be searched for, so nothing matches
+    connection = connection or get_db()
+    exact = find_exact(query, connection)
+    scored = None
+    if len(query) >= 3:
+        candidates = get_candidates(query, connection)
+        scored = score_candidates(query, candidates, connection, not exact)
+    return iterate_pages(query, connection, exact, scored)
+
+
+def iterate_pages(query, connection, exact, scored=None, first=None):
+    """Yield ranked pages of results for query.
+
+    scored is every scored match for a long query (short ones are paged
+    by find_short instead), and first is the first page, if it's already
+    been found.
+    """
+    if first is None:
+        first = find_page(query, connection, scored)
+    if not exact and not first:
+        # Words aren't broken into their characters unless nothing else
+        # matches them
+        exact = find_exact(query, connection, literal=True)
+    glyphs = {glyph for _, glyph in exact}
+    page = first
+    ranked = rank([r for r in page if r[2] not in glyphs])
+    yield get_rows([*exact, *ranked], connection)
+    while len(page) == LIMIT:
+        page = find_page(query, connection, scored, get_key(page[-1]))
+        if page:
+            ranked = rank([r for r in page if r[2] not in glyphs])
+            yield get_rows(ranked, connection)
+
+
+def get_key(result):
+    """Return the sort key for a (score, name, glyph) result.
+
+    Results are ordered by score and then glyph, so a page can pick up
+    right after the last result of the one before it.
+    """
+    score, _, glyph = result
+    return -score, glyph
+
+
+def find_page(query, connection, scored=None, after=None):
+    """Return up to LIMIT (score, name, glyph) results following after.
+
+    after is the key of the last result of the previous page.  Matches
+    from the character ranges come last (with a score of 0), in code
+    point order.
+    """
+    start = 0
+    if after is None or after[0] < 0:
+        if scored is None:
+            page = find_short(query, connection, after)
         else:
-            name = "".join(
-                r"\N{" + unicodedata.name(c) + r"}"
-                for c in self.character
-            )
-        pyperclip.copy(name)
-        self.notify(f'[green]Copied[/green] "{name}"')
-        increment_copy_count(self.name, self.character)
-
-    def on_click(self, event):
-        self.action_copy_character()
-
-
-class SearchBox(Input):
-
-    BINDINGS = [
-        Binding("enter", "first_result", "Select first result", priority=True),
+            index = 0
+            if after is not None:
+                index = bisect_right(scored, after, key=get_key)
+            page = scored[index:index+LIMIT]
+    else:
+        page = []
+        start = ord(after[1]) + 1
+    found = find_in_ranges(query, LIMIT - len(page), connection, start)
+    return page + [(0, name, glyph) for name, glyph in found]
+
+
+@timings.timed("search sql")
+def find_short(query, connection, after=None):
+    """Return a page of (score, name, glyph) matches for a short query.
+
+    Queries too short for the trigram index match far too much to score
+    every match, so these are just exact keyword matches first, then the
+    most commonly used characters.  Pages are found with keyset
+    pagination: the query picks up after the previous page's last key.
+    """
+    tables = get_tables("keywords")
+    exact = " UNION ".join(
+        f"SELECT glyph FROM {table} WHERE keyword = ? COLLATE NOCASE"
+        for table in tables
+    )
+    matches = " UNION ".join(
+        f"SELECT glyph FROM {table} WHERE keyword LIKE ?"
+        for table in tables
+    )
+    variables = [query] * len(tables) + [f"%{query}%"] * len(tables)
+    if matches_glyphs(query):
+        matches += " UNION SELECT glyph FROM symbols WHERE glyph LIKE ?"
+        variables.append(f"%{query}%")
+    following = ""
+    if after is not None:
+        following = "WHERE (-score, glyph) > (?, ?)"
+        variables += after
+    # The score is ranking.score(match, priority), computed in SQL
+    cursor = connection.execute(f"""
+        SELECT score, name, glyph FROM (
+            SELECT name, glyph, 3 * CASE WHEN glyph IN (
+                {exact}
+            ) THEN {ranking.EXACT} ELSE {ranking.SUBSTRING} END
+            + 1.5 * priority / 100 AS score
+            FROM symbols
+            WHERE glyph IN ({matches})
+        )
+        {following}
+        ORDER BY score DESC, glyph
+        LIMIT {LIMIT}
+    """, variables)
+    return cursor.fetchall()
+
+
+@timings.timed("search sql")
+def get_candidates(query, connection):
+    """Return (match text, name, glyph, priority, rarity) for every match.
+
+    The trigram index answers LIKE '%query%' without a full table scan.
+    Candidates are ordered by priority, which breaks ties in their scores.
+    """
+    tables = get_tables("keyword_search")
+    matches = " UNION ALL ".join(f"""
+        SELECT keyword, name, symbols.glyph, priority, rarity, symbols.rowid
+        FROM {table} AS search
+        INNER JOIN symbols ON symbols.glyph = search.glyph
+        WHERE keyword LIKE ?
+    """ for table in tables)
+    variables = [f"%{query}%"] * len(tables)
+    if matches_glyphs(query):
+        matches += """
+            UNION ALL
+            SELECT glyph, name, glyph, priority, 1.0, rowid
+            FROM symbols
+            WHERE glyph LIKE ?
+        """
+        variables.append(f"%{query}%")
+    cursor = connection.execute(f"""
+        {matches}
+        ORDER BY 4 DESC, 6
+    """, variables)
+    return [
+        (text.translate(ascii_lowercase), name, glyph, priority, rarity)
+        for text, name, glyph, priority, rarity, _ in cursor
     ]
 
-    class Done(Message):
-        """Searching done."""
-
-    def action_first_result(self):
-        self.post_message(self.Done())
-
-
-class SearchResults(Static):
-
-    results = reactive(list, recompose=True)
-
-    def compose(self):
-        for name, character in self.results:
-            yield Result(name, character)
-
-
-class UnicodeApp(App):
-    """A Textual app to search Unicode characters."""
-
-    CSS_PATH = "utf.tcss"
 
-    NOTIFICATION_TIMEOUT = 10
-    BINDINGS = [
-        ("ctrl+t", "toggle_dark", "Toggle dark mode"),
-        ("ctrl+l", "clear_search", "Clear search"),
-        Binding("up", "move_up", "Move up", priority=True, show=False),
-        Binding("down", "move_down", "Move down", priority=True, show=False),
-        Binding("left", "move_left", "Move left", show=False),
-        Binding("right", "move_right", "Move right", show=False),
+@timings.timed("search typos")
+def find_typos(query, connection):
+    """Return candidates (with their edit distance) that query misspells.
+
+    Text within a couple of edits of the query has to share most of its
+    trigrams, so the trigram index finds the few rows worth comparing:
+    those sharing the most trigrams (or one fewer), most common first.
+    """
+    limit = ranking.get_max_distance(query)
+    if not limit:
+        return []
+    # Each trigram is quoted as an FTS5 string
+    trigrams = [
+        '"' + trigram.replace('"', '""') + '"'
+        for trigram in ranking.get_trigrams(query)
     ]
+    shared = ranking.get_min_shared_trigrams(query, limit)
+    typos = []
+    # Row IDs only mean something within one table, so each shard is
+    # searched on its own
+    for table in get_tables("keyword_search"):
+        lookups = " UNION ALL ".join(
+            [f"SELECT rowid FROM {table} WHERE keyword_search MATCH ?"]
+            * len(trigrams)
+        )
+        cursor = connection.execute(f"""
+            SELECT keyword, name, symbols.glyph, priority, rarity
+            FROM (
+                SELECT rowid, count(*) AS shared, max(count(*)) OVER () AS most
+                FROM ({lookups})
+                GROUP BY rowid
+            ) AS matches
+            INNER JOIN {table} AS search ON search.rowid = matches.rowid
+            INNER JOIN symbols ON symbols.glyph = search.glyph
+            WHERE shared >= max(?, most - 1)
+            ORDER BY shared DESC, priority DESC, symbols.rowid
+            LIMIT {FUZZY_CANDIDATES}
+        """, [*trigrams, shared])
+        for text, name, glyph, priority, rarity in cursor:
+            text = text.translate(ascii_lowercase)
+            distance = ranking.get_distance(query, text, limit)
+            if distance:
+                typos.append((text, name, glyph, priority, rarity, distance))
+    return typos
+
+
+@timings.timed("search ranking")
+def score_candidates(query, candidates, connection, typos=True):
+    """Return (score, name, glyph) for every match, best first.
+
+    Each character is scored by its best matching candidate.  When
+    nothing matches at the start of a word, near misses (likely typos) are
+    scored too, unless typos is False.
+    """
+    folded = query.translate(ascii_lowercase)
+    best = {}
+    matched_word = False
+    for text, name, glyph, priority, rarity in candidates:
+        match = ranking.get_match(folded, text)
+        coverage = ranking.get_coverage(folded, text)
+        score = ranking.score(match, priority, rarity, coverage)
+        if glyph not in best or score > best[glyph][0]:
+            best[glyph] = (score, name, glyph)
+        matched_word = matched_word or match >= ranking.WORD
+    if typos and not matched_word:
+        for text, name, glyph, priority, rarity, distance in find_typos(
+            folded, connection
+        ):
+            match = ranking.get_match(folded, text, distance)
+            coverage = ranking.get_coverage(folded, text)
+            score = ranking.score(match, priority, rarity, coverage)
+            if glyph not in best or score > best[glyph][0]:
+                best[glyph] = (score, name, glyph)
+    return sorted(best.values(), key=get_key)
+
+
+def find_in_ranges(query, limit, connection=None, start=0):
+    """Return up to limit (name, glyph) matches from the character ranges.
+
+    These are the CJK ideographs, Hangul syllables and Tangut ideographs,
+    whose names aren't stored but generated from their code points.  They
+    come after the other matches, in code point order, starting at the
+    code point start.
+    """
+    if limit <= 0:
+        return []
+    connection = connection or get_db()
+    folded = query.translate(ascii_lowercase)
+    results = []
+    for first, last, prefix in connection.execute("""
+        SELECT first, last, prefix FROM ranges
+        WHERE last >= ?
+        ORDER BY first
+    """, (start,)):
+        code_points = ranges.find(folded, first, last, prefix, limit, start)
+        results += [
+            (ranges.get_name(prefix, code_point), chr(code_point))
+            for code_point in code_points
+        ]
+        if len(results) >= limit:
+            break
+    return results[:limit]
+
+
+def get_range_name(character, connection=None):
+    """Return the name of a character from one of the ranges, if it is."""
+    connection = connection or get_db()
+    row = connection.execute(
+        "SELECT prefix FROM ranges WHERE ? BETWEEN first AND last",
+        (ord(character),),
+    ).fetchone()
+    return ranges.get_name(row[0], ord(character)) if row else None
+
+
+@timings.timed("search ranking")
+def rank(scored):
+    """Return (name, glyph) for scored results, best first.
+
+    Copy frequency is added to the scores here rather than when they're
+    computed, since scores are cached and history changes.  It reorders
+    results within a page, but doesn't move them between pages.
+    """
+    copies = get_history().copies
+
+    def key(result):
+        score, _, glyph = result
+        if glyph in copies:
+            score += ranking.get_copy_bonus(copies[glyph])
+        return -score
+
+    return [(name, glyph) for _, name, glyph in sorted(scored, key=key)]
+
+
+class SearchSession:
+    """Search that reuses the work done for recent queries.
+
+    Typing almost always appends to the query, and a longer query can only
+    match a subset of what the query before it matched.  So the session
+    keeps every (keyword, glyph) match of the last query and narrows that
+    list in memory when the query is extended, only going back to the
+    database when the query is changed some other way.  Recent results are
+    also kept in an LRU cache, so backspacing is instant.
+    """
+
+    cache_size = 64
+
+    def __init__(self, connection=None):
+        self.connection = connection
+        self.query = None
+        self.candidates = None
+        self.recent = OrderedDict()
+
+    def find(self, query):
+        """Return the same results as find_character(query)."""
+        return next(self.pages(query))
+
+    def pages(self, query):
+        """Return the same pages as find_pages(query)."""
+        if SURROGATES.search(query):
+            return find_pages(query)
+        connection = self.connection or get_db()
+        if query in self.recent:
+            self.recent.move_to_end(query)
+            exact, scored, first = self.recent[query]
+        else:
+            exact = find_exact(query, connection)
+            candidates = scored = None
+            if len(query) >= 3:
+                # Shorter queries are too broad to keep every match around
+                # (and too short for the trigram index)
+                if self.can_narrow(query):
+                    folded = query.translate(ascii_lowercase)
+                    candidates = [
+                        candidate
+                        for candidate in self.candidates
+                        if folded in candidate[0]
+                    ]
+                else:
+                    candidates = get_candidates(query, connection)
+                scored = score_candidates(
+                    query, candidates, connection, not exact
+                )
+            first = find_page(query, connection, scored)
+            self.query, self.candidates = query, candidates
+            self.recent[query] = exact, scored, first
+            if len(self.recent) > self.cache_size:
+                self.recent.popitem(last=False)
+        return iterate_pages(query, connection, exact, scored, first)
+
+    def can_narrow(self, query):
+        return (
+            self.candidates is not None
+            and query.startswith(self.query)
+            # LIKE wildcards don't mean the same thing as substrings
+            and "%" not in query and "_" not in query
+            and (matches_glyphs(self.query) or not matches_glyphs(query))
+        )
 
-    results = reactive(list)
 
-    def compose(self):
-        """Called to add widgets to the app."""
-        self.dark = is_dark()
-        yield Footer()
-        yield SearchBox(placeholder="Search for a character")
-        yield SmartScroll(
-            SearchResults(id="results").data_bind(results=UnicodeApp.results)
+class CopyHistory:
+    """Ranked copy history, kept in memory and written to disk in batches.
+
+    Copies are applied to the in-memory ranking right away and queued, and
+    flush() writes the queue in one transaction.  Call flush() on a timer;
+    it also runs at exit.  Copies can be recorded from any thread, but
+    flush() has to be called from the thread that owns the connection.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.lock = threading.Lock()
+        self.pending = {}
+        with timings.timed("history sql"):
+            copied = connection.execute("""
+                SELECT symbols.name, copied.glyph, title, code, entity,
+                    unicode_escape, named_escape, copies, last_copied
+                FROM copied
+                LEFT JOIN reference.symbols
+                ON symbols.glyph = copied.glyph
+            """).fetchall()
+        self.entries = {}
+        for name, glyph, *columns, copies, last_copied in copied:
+            if name is None:
+                # Range characters and others named by unicodedata
+                row = make_row(get_name(glyph, connection) or "", glyph)
+            else:
+                row = Row(name, glyph, *columns)
+            self.entries[glyph] = (row, copies, last_copied or "")
+        self.rank()
+        atexit.register(self.flush)
+
+    def rank(self):
+        # Rebuilt rather than mutated, so readers in other threads always
+        # see a consistent snapshot
+        ranked = sorted(
+            self.entries.items(),
+            key=lambda item: (item[1][1], item[1][2]),
+            reverse=True,
         )
+        self.ranked = [row for _, (row, _, _) in ranked]
+        self.copies = {
+            glyph: copies
+            for glyph, (_, copies, _) in self.entries.items()
+        }
+
+    def record(self, name, glyph):
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        with self.lock:
+            if glyph in self.entries:
+                row, copies, _ = self.entries[glyph]
+            else:
+                row, copies = make_row(name, glyph), 0
+            self.entries[glyph] = (row, copies + 1, now)
+            increments, _ = self.pending.get(glyph, (0, now))
+            self.pending[glyph] = (increments + 1, now)
+            self.rank()
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, {}
+            with timings.timed("history sql"), self.connection:
+                self.connection.executemany("""
+                    INSERT INTO copied (glyph, copies, last_copied)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(glyph) DO UPDATE SET
+                        copies = copies + excluded.copies,
+                        last_copied = excluded.last_copied
+                """, [
+                    (glyph, increments, last_copied)
+                    for glyph, (increments, last_copied) in pending.items()
+                ])
+
+
+@cache
+def get_history():
+    return CopyHistory(get_history_db())
 
-    def action_clear_search(self):
-        self.query_one(SearchBox).focus()
-        self.query_one(SearchBox).value = ""
-
-    def clear_results(self):
-        self.results = get_character_cache()
-
-    def action_move_up(self):
-        if not isinstance(self.focused, Result):
-            return
-        queries = self.query(Result)
-        index = list(queries).index(self.focused)
-        index -= self.grid_size
-        if index >= 0:
-            self.query(Result)[index].focus()
-        else:
-            self.query_one(SearchBox).focus()
-
-    def action_move_down(self):
-        if not isinstance(self.focused, Result):
-            self.query(Result)[0].focus()
-            return
-        queries = self.query(Result)
-        index = list(queries).index(self.focused)
-        index += self.grid_size
-        if index < len(queries):
-            self.query(Result)[index].focus()
-
-    def action_move_left(self):
-        queries = self.query(Result)
-        index = list(queries).index(self.focused)
-        index -= 1
-        if index >= 0 and (index+1) % self.grid_size > 0:
-            self.query(Result)[index].focus()
-
-    def action_move_right(self):
-        queries = self.query(Result)
-        index = list(queries).index(self.focused)
-        index += 1
-        if index < len(queries) and index % self.grid_size > 0:
-            self.query(Result)[index].focus()
-
-    def on_resize(self, event):
-        if event.size.width > 200:
-            self.query_one(SearchResults).set_classes("large")
-            self.grid_size = 5
-        elif event.size.width > 150:
-            self.query_one(SearchResults).set_classes("medium")
-            self.grid_size = 4
-        elif event.size.width > 100:
-            self.query_one(SearchResults).set_classes("small")
-            self.grid_size = 3
-        elif event.size.width > 70:
-            self.query_one(SearchResults).set_classes("tiny")
-            self.grid_size = 2
-        else:
-            self.query_one(SearchResults).set_classes("")
-            self.grid_size = 1
 
-    def on_load(self):
-        self.clear_results()
+def increment_copy_count(name, glyph):
+    get_history().record(name.lower(), glyph)
 
-    def on_search_box_done(self, message):
-        if not isinstance(self.focused, Result):
-            self.query(Result)[0].focus()
-            return
 
-    def on_input_changed(self, message):
-        if message.value:
-            self.results = find_character(message.value)
-        else:
-            self.clear_results()
+def get_character_cache():
+    """Return Rows for copied characters, most copied first."""
+    return get_history().ranked
+
 
-app = UnicodeApp()
+startup.mark("import utf")
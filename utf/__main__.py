@@ -1,8 +1,137 @@
-from . import app
+import argparse
+from contextlib import contextmanager
+import cProfile
+import os
+from pathlib import Path
+import sys
+
+from . import startup, timings
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        prog="utf",
+        description="Search for Unicode characters",
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="show the first frame, then exit and print startup timings",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time searches, rendering and copies (F2 shows the timings)",
+    )
+    parser.add_argument(
+        "--profile-output",
+        type=Path,
+        metavar="PATH",
+        help="also write the timings to PATH at exit: every sample as JSON "
+        "if PATH ends in .json, or else cProfile stats for pstats (which "
+        "only cover the main thread, not the app's background searches)",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    for command, help, metavar in [
+        ("search", "print characters matching each query", "QUERY"),
+        ("lookup", "print details for each character in TEXT", "TEXT"),
+    ]:
+        subparser = subparsers.add_parser(command, help=help)
+        subparser.add_argument("queries", nargs="*", metavar=metavar)
+        subparser.add_argument(
+            "--stdin",
+            action="store_true",
+            help="read one query per line from standard input",
+        )
+        subparser.add_argument(
+            "--format",
+            choices=["jsonl", "tsv"],
+            default="jsonl",
+            help="output JSON Lines (the default) or tab-separated values",
+        )
+    subparser = subparsers.add_parser(
+        "inspect",
+        help="print the non-ASCII and invisible characters in files",
+    )
+    subparser.add_argument("paths", nargs="+", metavar="PATH")
+    subparser.add_argument(
+        "--format",
+        choices=["jsonl", "tsv"],
+        default="jsonl",
+        help="output JSON Lines (the default) or tab-separated values",
+    )
+    subparser.add_argument(
+        "--jobs",
+        type=int,
+        help="number of files to inspect at once (default: one per CPU)",
+    )
+    subparsers.add_parser(
+        "serve",
+        help="keep the index warm for other utf processes to search",
+    )
+    args = parser.parse_args()
+    if args.profile or args.profile_output:
+        timings.enabled = True
+    with profiling(args.profile_output):
+        status = run(args)
+    if timings.enabled:
+        print(timings.report(), file=sys.stderr)
+    if status:
+        sys.exit(status)
+
+
+@contextmanager
+def profiling(path):
+    """Write the timings to path (if given) when the block is done."""
+    if path is None:
+        yield
+        return
+    if path.suffix == ".json":
+        try:
+            yield
+        finally:
+            timings.export(path)
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
+
+
+def run(args):
+    """Run the command (or the app) and return its exit status."""
+    if args.command == "serve":
+        from .daemon import serve
+        serve()
+        return
+    if args.command:
+        from . import cli
+        status = 0
+        try:
+            if args.command == "inspect":
+                if not cli.inspect(args.paths, args.format, args.jobs):
+                    status = 1
+            elif args.stdin:
+                cli.run(args.command, sys.stdin, args.format, stream=True)
+            else:
+                cli.run(args.command, args.queries, args.format, stream=False)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # The reader went away (e.g. piped into head), which is fine,
+            # but stop Python from complaining when it flushes at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return status
+    # Textual is by far the slowest import, so it waits until it's needed
+    from .tui import UnicodeApp
+    startup.mark("import textual")
+    app = UnicodeApp(startup_profile=args.startup_profile)
+    startup.mark("construct app")
     app.run()
+    if args.startup_profile:
+        print(startup.report())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+"""Non-interactive lookups for scripts and editor integrations."""
+import codecs
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache, partial
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+from . import daemon, find_character, get_name, make_row
+
+
+FIELDS = ("character", "name", "code", "html", "escape", "named_escape")
+
+# json.dumps builds a new encoder per call when given any options
+encoder = json.JSONEncoder(ensure_ascii=False)
+
+
+def describe(row):
+    """Return the fields shown for a Row, in FIELDS order."""
+    return (
+        row.glyph,
+        row.title,
+        row.code,
+        row.entity,
+        row.unicode_escape,
+        row.named_escape,
+    )
+
+
+@cache
+def describe_character(character):
+    return describe(make_row(get_name(character) or "", character))
+
+
+def format_record(values, format, query=None):
+    if format == "tsv":
+        if query is not None:
+            values = (query, *values)
+        return "\t".join(values) + "\n"
+    record = dict(zip(FIELDS, values))
+    if query is not None:
+        record = {"query": query, **record}
+    return encoder.encode(record) + "\n"
+
+
+def search(query, client=None):
+    results = client and client.find(query)
+    if results is None:
+        results = find_character(query)
+    return [describe(row) for row in results]
+
+
+def lookup(text):
+    """Describe each code point in text."""
+    return [describe_character(character) for character in text]
+
+
+def run(command, queries, format, stream, output=sys.stdout):
+    """Write results for each query, one batch of lines per query.
+
+    With stream=True every line is labeled with its query and output is
+    flushed after each one, so a caller piping queries in one at a time
+    gets each answer as soon as it's ready.  All queries share a single
+    connection, and sqlite3 reuses its prepared statements between them.
+    Searches go to the daemon (utf serve) instead when it's running.
+    """
+    if command == "search":
+        handler = partial(search, client=daemon.connect())
+    else:
+        handler = lookup
+    for query in queries:
+        query = query.rstrip("\n")
+        if not query:
+            continue
+        label = query if stream else None
+        output.write("".join(
+            format_record(values, format, label)
+            for values in handler(query)
+        ))
+        if stream:
+            output.flush()
+
+
+INSPECT_FIELDS = ("path", "line", "column", *FIELDS)
+
+# Tab, newline, carriage return and printable ASCII aren't reported
+ORDINARY = bytes([9, 10, 13, *range(32, 127)])
+UNUSUAL = re.compile(r"[^\t\n\r\x20-\x7e]")
+CHUNK_SIZE = 64 * 1024
+
+
+def find_unusual(file):
+    """Yield (line, column) and character for unusual characters in file.
+
+    That's every non-ASCII character, plus ASCII control characters other
+    than tabs and line endings.  The binary file is read and decoded as
+    UTF-8 a chunk at a time (bytes that aren't valid UTF-8 are reported as
+    U+FFFD).  Chunks with nothing to report, which is nearly all of them,
+    are skipped after a quick check of the raw bytes.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    line = 1
+    line_start = offset = 0  # In characters from the start of the file
+    while True:
+        chunk = file.read(CHUNK_SIZE)
+        text = decoder.decode(chunk, final=not chunk)
+        position = 0
+        if not text.isascii() or chunk.translate(None, ORDINARY):
+            for match in UNUSUAL.finditer(text):
+                newlines = text.count("\n", position, match.start())
+                if newlines:
+                    line += newlines
+                    newline = text.rfind("\n", position, match.start())
+                    line_start = offset + newline + 1
+                position = match.start()
+                column = offset + position - line_start + 1
+                yield (line, column), match[0]
+        newlines = text.count("\n", position)
+        if newlines:
+            line += newlines
+            line_start = offset + text.rfind("\n") + 1
+        offset += len(text)
+        if not chunk:
+            break
+
+
+def inspect_file(path, format="jsonl", output=sys.stdout):
+    """Write a line for every unusual character in the file at path.
+
+    Lines are written as they're found, so memory use doesn't grow with
+    the file.  Returns False if the file couldn't be read (after
+    reporting why).
+    """
+    try:
+        with open(path, "rb") as file:
+            for (line, column), character in find_unusual(file):
+                values = describe_character(character)
+                if format == "tsv":
+                    values = (path, str(line), str(column), *values)
+                    output.write("\t".join(values) + "\n")
+                else:
+                    values = (path, line, column, *values)
+                    record = dict(zip(INSPECT_FIELDS, values))
+                    output.write(encoder.encode(record) + "\n")
+    except OSError as error:
+        print(f"utf: {error}", file=sys.stderr)
+        return False
+    return True
+
+
+def spool_file(path, format):
+    """Inspect the file at path into a temporary file.
+
+    Used by the process pool, so results are passed back on disk rather
+    than in memory.  Returns the temporary file's path and whether the
+    file could be read.
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", newline="", suffix=".jsonl", delete=False
+    ) as spool:
+        succeeded = inspect_file(path, format, spool)
+    return spool.name, succeeded
+
+
+def walk(paths):
+    """Yield each file path in paths, looking inside directories."""
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, subdirectories, names in os.walk(path):
+                subdirectories.sort()
+                for name in sorted(names):
+                    yield os.path.join(directory, name)
+        else:
+            yield path
+
+
+def inspect(paths, format, jobs=None, output=sys.stdout):
+    """Write the unusual characters in each file, one file at a time.
+
+    Files are inspected by a pool of processes, but their output is
+    written in the order the files were given.  Returns False if any of
+    the files couldn't be read.
+    """
+    paths = list(walk(paths))
+    if len(paths) == 1 or jobs == 1:
+        results = [inspect_file(path, format, output) for path in paths]
+        return all(results)
+    succeeded = True
+    with ProcessPoolExecutor(jobs) as executor:
+        spools = executor.map(spool_file, paths, [format] * len(paths))
+        for name, ok in spools:
+            try:
+                with open(name, encoding="utf-8", newline="") as spool:
+                    shutil.copyfileobj(spool, output)
+            finally:
+                os.remove(name)
+            succeeded = succeeded and ok
+    return succeeded
@@ -0,0 +1,195 @@
+"""Optional search daemon (``utf serve``) that keeps the index warm.
+
+The daemon loads the database into memory once and answers requests over
+a Unix domain socket, so every ``utf`` process (and any editor plugin)
+shares one warm index and one copy history.  Clients fall back to
+searching in-process when the daemon isn't running.
+
+The protocol is line based.  Each request is a command and its arguments
+separated by tabs, and each response is one line of JSON:
+
+- ``find<TAB>QUERY``: a list of results, each a list of the fields of a
+  ``utf.Row`` (the name, glyph and the text shown for it)
+- ``history``: the copy history, as a list of results like ``find``
+- ``copy<TAB>NAME<TAB>GLYPH``: records a copy and returns ``true``
+"""
+import json
+import os
+import signal
+import socket
+import sqlite3
+import stat
+import threading
+import time
+import warnings
+
+import platformdirs
+
+from . import (
+    Row,
+    SearchSession,
+    attach_shards,
+    get_character_cache,
+    get_db,
+    get_history,
+    increment_copy_count,
+)
+
+
+with warnings.catch_warnings():
+    # platformdirs warns when it has to fall back from $XDG_RUNTIME_DIR to
+    # a directory in /tmp, which is fine for a socket
+    warnings.simplefilter("ignore")
+    socket_path = platformdirs.user_runtime_path("utf", "treyhunner") / "utf.sock"
+
+# Seconds to wait on the daemon before searching in-process instead
+TIMEOUT = 5
+
+
+def is_private(directory):
+    """Return True if only the current user can use directory.
+
+    The /tmp fallback may be shared, so the socket is only trusted in a
+    directory the user owns that nobody else can get into.
+    """
+    try:
+        status = directory.lstat()
+    except OSError:
+        return False
+    return (
+        stat.S_ISDIR(status.st_mode)
+        and status.st_uid == os.getuid()
+        and not status.st_mode & 0o077
+    )
+
+
+class Client:
+    """Connection to a running daemon.
+
+    Every method returns None if the daemon has gone away, so callers can
+    fall back to searching in-process.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.file = connection.makefile("rw", encoding="utf-8", newline="\n")
+        self.lock = threading.Lock()
+
+    def request(self, *fields):
+        if self.connection is None:
+            return None
+        line = "\t".join(fields) + "\n"
+        if line.count("\t") != len(fields) - 1 or line.count("\n") != 1:
+            return None  # Tabs and newlines can't be sent, so search locally
+        try:
+            line.encode()
+        except UnicodeEncodeError:
+            return None  # Lone surrogates can't be sent either
+        try:
+            with self.lock:
+                self.file.write(line)
+                self.file.flush()
+                response = self.file.readline()
+        except OSError:
+            response = ""
+        if not response:
+            self.close()
+            return None
+        return json.loads(response)
+
+    def find(self, query):
+        results = self.request("find", query)
+        return results and [Row(*result) for result in results]
+
+    def history(self):
+        results = self.request("history")
+        return results and [Row(*result) for result in results]
+
+    def record(self, name, glyph):
+        return self.request("copy", name, glyph)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def connect():
+    """Return a Client for the running daemon, or None if there isn't one."""
+    if not is_private(socket_path.parent) or not socket_path.exists():
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # A timeout is an OSError, so a hung daemon is treated as a gone one
+    connection.settimeout(TIMEOUT)
+    try:
+        connection.connect(str(socket_path))
+    except OSError:
+        connection.close()
+        return None
+    return Client(connection)
+
+
+def serve(flush_interval=5):
+    """Answer requests until interrupted."""
+    import socketserver
+
+    # Searches run against an in-memory copy of the database, shared by
+    # all clients; SQLite calls are serialized, and each takes well under
+    # a millisecond
+    memory = sqlite3.connect(":memory:", uri=True, check_same_thread=False)
+    get_db().backup(memory)
+    attach_shards(memory)
+    lock = threading.Lock()
+    history = get_history()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            session = SearchSession(memory)
+            for line in self.rfile:
+                line = line.decode().rstrip("\n")
+                command, _, argument = line.partition("\t")
+                if command == "find":
+                    with lock:
+                        response = session.find(argument)
+                elif command == "history":
+                    response = get_character_cache()
+                elif command == "copy":
+                    name, _, glyph = argument.partition("\t")
+                    increment_copy_count(name, glyph)
+                    response = True
+                else:
+                    response = {"error": f"unknown command: {command}"}
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        last_flush = time.monotonic()
+
+        def service_actions(self):
+            # Runs in the main thread, which owns the database connection
+            if time.monotonic() - self.last_flush > flush_interval:
+                history.flush()
+                self.last_flush = time.monotonic()
+
+    if connect() is not None:
+        raise SystemExit(f"utf is already serving on {socket_path}")
+    socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if socket_path.parent.lstat().st_uid == os.getuid():
+        socket_path.parent.chmod(0o700)  # Made by an older version of utf
+    if not is_private(socket_path.parent):
+        raise SystemExit(
+            f"utf won't serve from {socket_path.parent}: it must be owned by"
+            " you and not accessible to anyone else"
+        )
+    socket_path.unlink(missing_ok=True)  # Left behind by a crashed daemon
+    # Clean up on SIGTERM just like on Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with Server(str(socket_path), Handler) as server:
+        print(f"Serving on {socket_path}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            socket_path.unlink(missing_ok=True)
+            history.flush()
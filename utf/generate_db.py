@@ -1,14 +1,58 @@
 # Inspired by https://github.com/sethmlarson/utf8.xyz/blob/main/build-db.py
+from collections import Counter
+from contextlib import closing, contextmanager
 from dataclasses import dataclass
+import hashlib
+from html.entities import codepoint2name
 import importlib.resources
 import json
+from math import log
+import os
+from pathlib import Path
+import shutil
 import sqlite3
 import csv
+import sys
+import tempfile
+import unicodedata
 
 import platformdirs
 
 
+# Reference data, derived from the source files and never written to once
+# built, so it's safe to delete.  Copy history is kept apart from it.
 db_path = platformdirs.user_cache_path("utf", "treyhunner") / "utf8.db"
+history_path = platformdirs.user_data_path("utf", "treyhunner") / "history.db"
+
+# Generated into the wheel by hatch_build.py
+prebuilt_name = "utf8.db"
+
+# Keywords in other languages, from emojilib or CLDR annotation files named
+# after their locale (like de.json).  Each configured locale gets its own
+# database (a shard), built the first time it's searched.
+locales_path = platformdirs.user_data_path("utf", "treyhunner") / "locales"
+
+# Bump whenever the reference tables change (in shape or in how they are
+# derived from the sources) to force existing databases to be rebuilt
+SCHEMA_VERSION = 5
+
+# Files the reference tables are built from
+source_names = ("UnicodeData.txt", "emoji-en-US.json")
+
+# Range labels in UnicodeData.txt and the names their characters get
+range_prefixes = {
+    "cjk ideograph": "cjk unified ideograph-",
+    "hangul syllable": "hangul syllable ",
+    "tangut ideograph": "tangut ideograph-",
+}
+
+
+def source_file(name):
+    """Return a data file that ships alongside this module."""
+    if __package__:
+        return importlib.resources.files(__package__) / name
+    # Loaded as a standalone module by the build hook
+    return Path(__file__).with_name(name)
 
 
 @dataclass(slots=True, frozen=True)
@@ -36,9 +80,59 @@ class Character:
         return "<" in self.name
 
 
+def get_code_point(character):
+    """Return the zero-padded hex code point of a single character."""
+    if len(character) != 1:
+        return ""
+    code = f"{ord(character):X}"
+    return code.zfill(8 if len(code) > 4 else 4)
+
+
+def get_html_entity(character):
+    codes = [ord(c) for c in character]
+    return "".join(
+        f"&{codepoint2name.get(c, f'#{c}')};"
+        for c in codes
+    )
+
+
+def get_escape(character):
+    """Return the Python escape sequence (e.g. \\u2728) for character."""
+    return character.encode("unicode_escape").decode()
+
+
+def get_named_escape(name, character):
+    """Return the \\N{...} escape sequence for character.
+
+    Characters without a name (like control characters) have none, so
+    that's an empty string.
+    """
+    if len(character) == 1:
+        return r"\N{" + name.lower() + r"}" if name else ""
+    names = [unicodedata.name(c, "") for c in character]
+    if not all(names):
+        return ""
+    return "".join(r"\N{" + name + r"}" for name in names)
+
+
+def get_display_columns(name, glyph):
+    """Return the title, code point, HTML entity and escapes shown for glyph.
+
+    They're stored with each character when the database is built, so
+    showing a page of results doesn't format anything.
+    """
+    return (
+        name.title(),
+        get_code_point(glyph),
+        get_html_entity(glyph),
+        get_escape(glyph),
+        get_named_escape(name, glyph),
+    )
+
+
 def get_character_data():
     # File from https://www.unicode.org/Public/draft/UCD/ucd/UnicodeData.txt
-    path = importlib.resources.files("utf") / "UnicodeData.txt"
+    path = source_file("UnicodeData.txt")
     with path.open() as file:
         characters = [
             Character.from_csv_row(row)
@@ -50,9 +144,29 @@ def get_character_data():
         }
 
 
+def get_range_data(characters):
+    """Return (first, last, name prefix) for each range with named characters.
+
+    Ranges are listed in UnicodeData.txt as <..., First> and <..., Last>
+    rows.  Only ranges whose names can be generated (see utf.ranges) are
+    returned, so surrogates and private use areas are skipped.
+    """
+    ranges = []
+    first = None
+    for character in characters.values():
+        label, _, end = character.name.strip("<>").rpartition(", ")
+        if end == "first":
+            first = ord(character.glyph)
+        elif end == "last":
+            for start, prefix in range_prefixes.items():
+                if label.startswith(start):
+                    ranges.append((first, ord(character.glyph), prefix))
+    return ranges
+
+
 def get_keywords_data():
     # File from https://github.com/muan/emojilib/blob/main/dist/emoji-en-US.json
-    path = importlib.resources.files("utf") / "emoji-en-US.json"
+    path = source_file("emoji-en-US.json")
     keyword_data = json.loads(path.read_text())
     return [
         (keyword.replace("_", " "), glyph)
@@ -61,37 +175,245 @@ def get_keywords_data():
     ]
 
 
-def make_database():
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    db = sqlite3.connect(db_path)
+def reference_uri(path=db_path):
+    """Return the URI to open the reference database read-only with.
+
+    immutable=1 tells SQLite the file never changes, so readers skip file
+    locking entirely.  The database is replaced with a new file (never
+    changed in place) when it has to be rebuilt.
+    """
+    return f"{path.as_uri()}?mode=ro&immutable=1"
+
+
+@contextmanager
+def building(path, replace=True):
+    """Yield a new temporary file next to path, moved to path when done.
+
+    Building next to the real file and moving it into place means an
+    interrupted build never leaves a half-populated database behind, and
+    a unique name for each build means processes building at the same
+    time don't trip over each other.  If replace is False, a file that
+    another process put at path in the meantime is kept instead.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, name = tempfile.mkstemp(
+        prefix=f"{path.name}.", suffix=".tmp", dir=path.parent
+    )
+    os.close(descriptor)
+    build_path = Path(name)
+    try:
+        yield build_path
+        if replace:
+            build_path.replace(path)
+        else:
+            try:
+                os.link(build_path, path)
+            except FileExistsError:
+                pass  # Another process got there first
+            except OSError:
+                # No hard links here (like on FAT or many network shares),
+                # so create the file exclusively and copy into it instead
+                try:
+                    with open(path, "xb") as target:
+                        with open(build_path, "rb") as source:
+                            shutil.copyfileobj(source, target)
+                except FileExistsError:
+                    pass
+    finally:
+        build_path.unlink(missing_ok=True)
+
+
+def get_locales():
+    """Return the extra keyword locales to search, from $UTF_LOCALES.
+
+    English keywords are always searched, so they're skipped here.
+    """
+    locales = os.environ.get("UTF_LOCALES", "").replace(",", " ").split()
+    return [locale for locale in locales if locale not in ("en", "en-US")]
+
+
+def get_shard_path(locale):
+    return db_path.with_name(f"keywords-{locale}.db")
+
+
+def get_locale_keywords(path):
+    """Return (keyword, glyph) pairs from an emojilib or CLDR JSON file.
+
+    Raises ValueError if the file isn't in either format.
+    """
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    if "annotations" in data:
+        # CLDR's cldr-json annotations.json
+        try:
+            annotations = data["annotations"]["annotations"]
+            data = {
+                glyph: [*names.get("default", []), *names.get("tts", [])]
+                for glyph, names in annotations.items()
+            }
+        except (AttributeError, KeyError, TypeError) as error:
+            raise ValueError(f"unexpected CLDR annotations: {error}")
+    if not all(
+        isinstance(keywords, list)
+        and all(isinstance(keyword, str) for keyword in keywords)
+        for keywords in data.values()
+    ):
+        raise ValueError("expected a list of keywords for each character")
+    return {
+        (keyword.replace("_", " ").lower(), glyph)
+        for glyph, keywords in data.items()
+        for keyword in keywords
+    }
+
+
+def update_shard(locale, path=None):
+    """Build the keyword shard for locale if it's missing or out of date.
+
+    Returns the shard's path, or None if there's no usable file for the
+    locale (a broken one is reported on stderr and skipped).
+    """
+    source = locales_path / f"{locale}.json"
+    if not source.is_file():
+        return None
+    path = path or get_shard_path(locale)
+    stat = source.stat()
+    stamp = f"{SCHEMA_VERSION}:{stat.st_size}:{stat.st_mtime_ns}"
+    if path.exists():
+        try:
+            with closing(sqlite3.connect(reference_uri(path), uri=True)) as db:
+                query = db.execute("SELECT stamp FROM sources")
+                (recorded,) = query.fetchone()
+        except (sqlite3.DatabaseError, TypeError):
+            recorded = None  # Not a shard we built, so it's rebuilt
+        if recorded == stamp:
+            return path
+    try:
+        keywords = get_locale_keywords(source)
+    except (OSError, ValueError) as error:
+        print(f"utf: skipping locale {locale}: {error}", file=sys.stderr)
+        return None
+    if not keywords:
+        return None
+    with building(path) as build_path:
+        with closing(sqlite3.connect(build_path, isolation_level=None)) as db:
+            db.execute("PRAGMA journal_mode = OFF")
+            db.execute("BEGIN")
+            db.execute(
+                "CREATE TABLE keywords (keyword TEXT, glyph TEXT, rarity REAL)"
+            )
+            db.execute(
+                "CREATE TABLE sources (name TEXT PRIMARY KEY, stamp TEXT)"
+            )
+            create_search_index(db)
+            populate_keywords_table(db, keywords)
+            populate_search_index(db)
+            db.execute(
+                "CREATE INDEX keyword_index ON keywords "
+                "(keyword COLLATE NOCASE)"
+            )
+            db.execute(
+                "INSERT INTO sources (name, stamp) VALUES (?, ?)",
+                (source.name, stamp),
+            )
+            db.execute("COMMIT")
+    return path
+
+
+def make_database(path=db_path):
+    """Build the reference database at path in a single transaction."""
+    with building(path) as build_path:
+        with closing(sqlite3.connect(build_path, isolation_level=None)) as db:
+            db.execute("PRAGMA journal_mode = OFF")
+            db.execute("PRAGMA synchronous = OFF")
+            db.execute("PRAGMA cache_size = -65536")
+            db.execute("BEGIN")
+            make_reference_tables(db)
+            db.execute("COMMIT")
+
+
+def make_history_database(path=history_path, legacy=None):
+    """Create the copy history database at path.
+
+    History is carried over from the copied table of legacy (a database
+    from before history was split out) if given, or else seeded with some
+    commonly copied characters.  History another process created in the
+    meantime is left alone.
+    """
+    with building(path, replace=False) as build_path:
+        with closing(sqlite3.connect(build_path.as_uri(), uri=True)) as db:
+            db.execute("PRAGMA journal_mode = WAL")
+            db.execute(
+                """
+                CREATE TABLE copied (
+                    glyph TEXT PRIMARY KEY,
+                    copies INTEGER,
+                    last_copied DATETIME
+                );
+                """
+            )
+            if legacy is not None:
+                db.execute(
+                    "ATTACH ? AS legacy", (f"{legacy.as_uri()}?mode=ro",)
+                )
+                db.execute(
+                    """
+                    INSERT INTO copied (glyph, copies, last_copied)
+                    SELECT glyph, copies, last_copied FROM legacy.copied
+                    """
+                )
+                db.commit()
+                db.execute("DETACH legacy")
+            else:
+                populate_copied_table(db)
+                db.commit()
+
+
+def make_reference_tables(db):
+    """Create and fill every table that's derived from the source files."""
     db.execute(
         """
         CREATE TABLE symbols (
             glyph TEXT PRIMARY KEY,
             name TEXT,
             category TEXT DEFAULT '',
-            priority INTEGER
+            priority INTEGER,
+            title TEXT,
+            code TEXT,
+            entity TEXT,
+            unicode_escape TEXT,
+            named_escape TEXT
         );
         """
     )
     db.execute(
         """
-        CREATE TABLE copied (
-            glyph TEXT PRIMARY KEY,
-            copies INTEGER,
-            last_copied DATETIME
+        CREATE TABLE keywords (
+            keyword TEXT,
+            glyph TEXT,
+            rarity REAL
         );
         """
     )
     db.execute(
         """
-        CREATE TABLE keywords (
-            keyword TEXT,
-            glyph TEXT
+        CREATE TABLE ranges (
+            first INTEGER,
+            last INTEGER,
+            prefix TEXT
         );
         """
     )
-    db.execute("CREATE INDEX keyword_index ON keywords (keyword COLLATE NOCASE);")
+    db.execute(
+        """
+        CREATE TABLE sources (
+            name TEXT PRIMARY KEY,
+            stamp TEXT,
+            hash TEXT
+        );
+        """
+    )
+    create_search_index(db)
     characters = get_character_data()
     keywords = get_keywords_data()
     for name, glyph in keywords:
@@ -105,44 +427,189 @@ def make_database():
     common = common_characters()
     populate_chars_table(db, characters.values(), common)
     populate_keywords_table(db, keywords)
-    populate_copied_table(db)
-    db.commit()
-    db.close()
+    populate_search_index(db)
+    db.executemany(
+        "INSERT INTO ranges (first, last, prefix) VALUES (?, ?, ?)",
+        get_range_data(characters),
+    )
+    # Indexing after the bulk insert is cheaper than maintaining it per row
+    db.execute("CREATE INDEX keyword_index ON keywords (keyword COLLATE NOCASE);")
+    db.executemany(
+        "INSERT INTO sources (name, stamp, hash) VALUES (?, ?, ?)",
+        [
+            (name, stamp, get_source_hash(name))
+            for name, stamp in get_source_stamps().items()
+        ]
+    )
+    db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
 
-def populate_chars_table(db, characters, common):
-    for char in characters:
-        if char.is_control:
-            continue
-        db.execute(
-            """
-            INSERT INTO symbols (
-                name, glyph, category, priority
-            ) VALUES (
-                ?, ?, ?, ?
+def install_database(path=db_path):
+    """Put a database at path, copying the prebuilt one if it's current.
+
+    Copying takes a few milliseconds, where building takes most of a
+    second.
+    """
+    prebuilt = source_file(prebuilt_name)
+    if prebuilt.is_file() and is_current(prebuilt):
+        copy_database(prebuilt, path)
+    else:
+        make_database(path)
+
+
+def is_current(path):
+    """Return True if the database at path matches the schema and sources."""
+    try:
+        with closing(sqlite3.connect(reference_uri(path), uri=True)) as db:
+            (version,) = db.execute("PRAGMA user_version").fetchone()
+            hashes = dict(db.execute("SELECT name, hash FROM sources"))
+    except sqlite3.DatabaseError:
+        return False  # From before sources were hashed
+    return version == SCHEMA_VERSION and hashes == {
+        name: get_source_hash(name) for name in source_names
+    }
+
+
+def copy_database(source, path):
+    """Copy the database source to path, recording current source stamps.
+
+    The stamps are updated on the copy before it's moved into place,
+    because readers assume the database at path never changes.
+    """
+    with building(path) as copy_path:
+        with source.open("rb") as file, copy_path.open("wb") as target:
+            shutil.copyfileobj(file, target)
+        with closing(sqlite3.connect(copy_path)) as db, db:
+            db.executemany(
+                "UPDATE sources SET stamp = ? WHERE name = ?",
+                [(stamp, name) for name, stamp in get_source_stamps().items()],
             )
-            """,
+
+
+def get_source_stamps():
+    """Return a cheap fingerprint (size and mtime) of each source file."""
+    stamps = {}
+    for name in source_names:
+        stat = source_file(name).stat()
+        stamps[name] = f"{stat.st_size}:{stat.st_mtime_ns}"
+    return stamps
+
+
+def get_source_hash(name):
+    return hashlib.sha256(source_file(name).read_bytes()).hexdigest()
+
+
+def update_database(path=db_path):
+    """Replace the database at path if the schema or source files changed.
+
+    When nothing changed this is one PRAGMA, one small query and a stat
+    call per source file.  Files are only hashed when their size or mtime
+    changed (e.g. after reinstalling the same version).  Copy history kept
+    in databases from before it had its own file is moved to history_path.
+    """
+    with closing(sqlite3.connect(reference_uri(path), uri=True)) as db:
+        (version,) = db.execute("PRAGMA user_version").fetchone()
+        if version == SCHEMA_VERSION:
+            stamps = get_source_stamps()
+            recorded = {
+                name: (stamp, hash)
+                for name, stamp, hash in db.execute("SELECT * FROM sources")
+            }
+            if stamps == {name: stamp for name, (stamp, _) in recorded.items()}:
+                return
+            hashes = {name: get_source_hash(name) for name in source_names}
+            if hashes == {name: hash for name, (_, hash) in recorded.items()}:
+                db.close()
+                copy_database(path, path)
+                return
+        has_history = db.execute(
+            "SELECT 1 FROM sqlite_schema WHERE name = 'copied'"
+        ).fetchone()
+    if has_history and not history_path.exists():
+        make_history_database(history_path, legacy=path)
+    install_database(path)
+    # Older databases used WAL mode and may have left these behind
+    for suffix in ("-wal", "-shm"):
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def create_search_index(db):
+    """Create the trigram full-text index used for substring searches."""
+    db.execute(
+        """
+        CREATE VIRTUAL TABLE keyword_search USING fts5(
+            keyword,
+            glyph UNINDEXED,
+            rarity UNINDEXED,
+            tokenize='trigram'
+        );
+        """
+    )
+
+
+def populate_search_index(db):
+    db.execute(
+        """
+        INSERT INTO keyword_search (keyword, glyph, rarity)
+        SELECT keyword, glyph, rarity FROM keywords
+        """
+    )
+
+
+def populate_chars_table(db, characters, common):
+    db.executemany(
+        """
+        INSERT INTO symbols (
+            name, glyph, category, priority,
+            title, code, entity, unicode_escape, named_escape
+        ) VALUES (
+            ?, ?, ?, ?, ?, ?, ?, ?, ?
+        )
+        """,
+        [
             (
                 char.name,
                 char.glyph,
                 char.category,
                 common.get(char.glyph, 0),
+                *get_display_columns(char.name, char.glyph),
             )
-        )
+            for char in characters
+            if not char.is_control
+        ]
+    )
 
 
 def populate_keywords_table(db, keywords):
-    for keyword, glyph in keywords:
-        db.execute(
-            """
-            INSERT INTO keywords (
-                keyword, glyph
-            ) VALUES (
-                ?, ?
-            )
-            """,
-            (keyword, glyph)
+    db.executemany(
+        """
+        INSERT INTO keywords (
+            keyword, glyph, rarity
+        ) VALUES (
+            ?, ?, ?
         )
+        """,
+        get_rarities(keywords)
+    )
+
+
+def get_rarities(keywords):
+    """Return (keyword, glyph, rarity) for each (keyword, glyph) pair.
+
+    Rarity is the inverse document frequency of the keyword, scaled to run
+    from 0 (a keyword every character has) to 1 (a keyword only one
+    character has), so a generic keyword like "face" counts for less than
+    a distinctive one like "sparkles".
+    """
+    glyph_counts = Counter(keyword for keyword, _ in keywords)
+    total = len({glyph for _, glyph in keywords})
+    if total <= 1:
+        # Every keyword belongs to the only character there is
+        return [(keyword, glyph, 1.0) for keyword, glyph in keywords]
+    return [
+        (keyword, glyph, log(total / glyph_counts[keyword]) / log(total))
+        for keyword, glyph in keywords
+    ]
 
 
 def populate_copied_table(db):
@@ -188,18 +655,19 @@ def populate_copied_table(db):
         "\N{HEAVY BLACK HEART}\N{VARIATION SELECTOR-16}",
         "\N{white medium star}",
     ]
-    for n, glyph in enumerate(fake_copies, start=1):
-        db.execute(
-            """
-            INSERT INTO copied (
-                glyph, copies, last_copied
-            ) VALUES (
-                ?, ?, datetime('now', '-{n} hour')
-            )
-            """,
-            (glyph, 0)
+    db.executemany(
+        """
+        INSERT INTO copied (
+            glyph, copies, last_copied
+        ) VALUES (
+            ?, ?, datetime('now', ?)
         )
-
+        """,
+        [
+            (glyph, 0, f"-{n} hour")
+            for n, glyph in enumerate(fake_copies, start=1)
+        ]
+    )
 
 
 def common_characters():
@@ -0,0 +1,87 @@
+"""Names for characters that UnicodeData.txt only lists as ranges.
+
+CJK ideographs, Hangul syllables and Tangut ideographs are listed as
+``<..., First>``/``<..., Last>`` pairs, and their names are derived from
+their code points.  The database stores just the ranges, and names are
+generated (and searched) here on demand.
+"""
+from functools import cache
+
+
+HANGUL = "hangul syllable "
+HANGUL_FIRST = 0xAC00
+# Romanized jamo used in Hangul syllable names (Unicode section 3.12)
+LEADS = "g gg n d dd r m b bb s ss - j jj c k t p h".split()
+VOWELS = "a ae ya yae eo e yeo ye o wa wae oe yo u weo we wi yu eu yi i".split()
+TAILS = "- g gg gs n nj nh d l lg lm lb ls lt lp lh m b bs s ss ng j c k t p h"
+TAILS = TAILS.split()
+HEX_DIGITS = set("0123456789abcdef")
+
+
+def get_name(prefix, code_point):
+    """Return the (lowercase) name of code_point in a range with prefix."""
+    if prefix == HANGUL:
+        index = code_point - HANGUL_FIRST
+        lead, rest = divmod(index, len(VOWELS) * len(TAILS))
+        vowel, tail = divmod(rest, len(TAILS))
+        jamo = LEADS[lead] + VOWELS[vowel] + TAILS[tail]
+        return prefix + jamo.replace("-", "")
+    return f"{prefix}{code_point:04x}"
+
+
+@cache
+def get_hangul_names(first, last):
+    return [get_name(HANGUL, code_point) for code_point in range(first, last+1)]
+
+
+def find(query, first, last, prefix, limit, start=0):
+    """Return up to limit code points whose names contain query, in order.
+
+    The query must already be lowercased.  Code points before start are
+    skipped.
+    """
+    if query in prefix:
+        first = max(first, start)
+        return list(range(first, min(last, first + limit - 1) + 1))
+    if prefix == HANGUL:
+        names = get_hangul_names(first, last)
+        matches = []
+        for code_point in range(max(first, start), last + 1):
+            if query in names[code_point - first]:
+                matches.append(code_point)
+                if len(matches) == limit:
+                    break
+        return matches
+    # The rest of the query has to be hex digits, either anywhere in the
+    # code point or right after the end of the prefix
+    width = len(f"{last:04x}")
+    first = max(first, start)
+    matches = []
+    for split in range(len(query)):
+        head, digits = query[:split], query[split:]
+        if not HEX_DIGITS.issuperset(digits) or len(digits) > width:
+            continue
+        if head and not prefix.endswith(head):
+            continue
+        positions = [0] if head else range(width - len(digits) + 1)
+        for position in positions:
+            matches += find_digits(digits, position, width, first, last, limit)
+    return sorted(set(matches))[:limit]
+
+
+def find_digits(digits, position, width, first, last, limit):
+    """Find code points with digits at position in their hex form."""
+    low_size = 16 ** (width - position - len(digits))
+    block = 16 ** len(digits) * low_size
+    offset = int(digits, 16) * low_size
+    matches = []
+    # Step through the possible values of the digits before position
+    high = max(0, (first - offset) // block)
+    while high * block + offset <= last and high < 16 ** position:
+        start = high * block + offset
+        for code_point in range(max(first, start), min(last + 1, start + low_size)):
+            matches.append(code_point)
+            if len(matches) == limit:
+                return matches
+        high += 1
+    return matches
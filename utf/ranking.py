@@ -0,0 +1,118 @@
+"""Scoring for search results.
+
+Every candidate (a keyword or name that matched the query, and the
+character it belongs to) gets a score made up of:
+
+- how it matched: exactly, as a prefix, at the start of a word, anywhere,
+  or only within a small edit distance (for typos)
+- how much of the keyword the query covers
+- how rare the keyword is, computed when the database is built
+- the character's priority (how commonly it's used)
+
+Copy frequency is added on top of that when results are shown, since
+copy history changes between searches.
+"""
+from math import log1p
+
+
+EXACT = 1.0
+PREFIX = 0.75
+WORD = 0.6
+SUBSTRING = 0.4
+# Per edit, for typos
+FUZZY = 0.3
+EDIT_PENALTY = 0.1
+
+# Copies needed for the full copy frequency bonus
+COPIES_FOR_FULL_BONUS = 20
+
+
+def get_match(query, text, distance=0):
+    """Return how well query matches text.
+
+    text contains query, unless distance (the number of typos it takes to
+    make query match) is given.
+    """
+    if distance:
+        return FUZZY - EDIT_PENALTY * distance
+    if text == query:
+        return EXACT
+    if text.startswith(query):
+        return PREFIX
+    if f" {query}" in text or f"-{query}" in text:
+        return WORD
+    return SUBSTRING
+
+
+def score(match, priority, rarity=0.0, coverage=0.0):
+    """Combine the signals for a candidate into one score."""
+    return 3 * match + coverage + rarity + 1.5 * priority / 100
+
+
+def get_coverage(query, text):
+    """Return the fraction of text that query covers."""
+    return min(1, len(query) / len(text))
+
+
+def get_copy_bonus(copies):
+    """Return the score added for a character copied this many times.
+
+    Characters in the copy history at all get half a point, so the ones
+    seeded into a new history still come first among similar matches.
+    """
+    return 0.5 + min(1, log1p(copies) / log1p(COPIES_FOR_FULL_BONUS))
+
+
+def get_max_distance(query):
+    """Return the number of typos to allow in query."""
+    if len(query) < 4:
+        return 0
+    return 1 if len(query) < 8 else 2
+
+
+def get_trigrams(query):
+    return {query[i:i+3] for i in range(len(query) - 2)}
+
+
+def get_min_shared_trigrams(query, distance):
+    """Return how many trigrams text must share with query to be in reach.
+
+    Each edit changes at most three of the query's trigrams.
+    """
+    return max(1, len(get_trigrams(query)) - 3 * distance)
+
+
+def get_distance(query, text, limit):
+    """Return the fewest edits to turn query into some substring of text.
+
+    Edits are insertions, deletions, substitutions and swaps of adjacent
+    characters.  Returns None if it takes more than limit edits.
+    """
+    # Column j holds the distances between each query[:i] and the best
+    # substring of text ending at j, and a substring can start anywhere
+    # for free.  Called on up to a hundred candidates per keystroke, so
+    # the loop avoids function calls.
+    size = len(query)
+    previous2 = previous = list(range(size + 1))
+    best = size
+    last = ""
+    for character in text:
+        current = [0] * (size + 1)
+        above = 0
+        for i in range(1, size + 1):
+            wanted = query[i - 1]
+            distance = previous[i - 1] + (wanted != character)
+            if previous[i] + 1 < distance:
+                distance = previous[i] + 1
+            if above + 1 < distance:
+                distance = above + 1
+            if (
+                i > 1 and wanted == last and query[i - 2] == character
+                and previous2[i - 2] + 1 < distance
+            ):
+                distance = previous2[i - 2] + 1
+            current[i] = above = distance
+        if above < best:
+            best = above
+        previous2, previous, last = previous, current, character
+    return best if best <= limit else None
@@ -0,0 +1,25 @@
+"""Startup phase timings, reported by ``utf --startup-profile``."""
+import time
+
+
+phases = []
+_last = _start = time.perf_counter()
+
+
+def mark(phase):
+    """Record the time spent since the previous mark as the given phase."""
+    global _last
+    now = time.perf_counter()
+    phases.append((phase, now - _last))
+    _last = now
+
+
+def report():
+    """Return a table of the recorded phases and their total."""
+    width = max(len(phase) for phase, _ in phases + [("total", 0)])
+    lines = [
+        f"{phase:<{width}}  {seconds * 1000:8.1f} ms"
+        for phase, seconds in phases
+    ]
+    lines.append(f"{'total':<{width}}  {(_last - _start) * 1000:8.1f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,94 @@
+"""Timings of the work done while utf runs, recorded by ``utf --profile``.
+
+Recording is off unless it's turned on with --profile (or by setting
+$UTF_PROFILE), and then every timed phase keeps all of its samples.  The
+phases are:
+
+- ``search``: a whole search, from the query to its results
+- ``search sql``: database queries made while searching
+- ``search ranking``: scoring and sorting matches in Python (including
+  any typo lookup)
+- ``search typos``: looking up near misses for a query
+- ``history sql``: loading and saving the copy history
+- ``render``: from new results to the screen being refreshed
+- ``keystroke``: from the search box changing to its results being shown
+- ``clipboard``: copying to the clipboard
+"""
+from contextlib import contextmanager
+import json
+import os
+import time
+
+
+enabled = bool(os.environ.get("UTF_PROFILE"))
+
+# Samples in seconds, by phase
+samples = {}
+
+# Samples shown in the app's overlay, most recent last
+WINDOW = 200
+
+
+def record(phase, seconds):
+    """Record a sample for phase, if timings are enabled."""
+    if enabled:
+        samples.setdefault(phase, []).append(seconds)
+
+
+@contextmanager
+def timed(phase):
+    """Time the code in a with block (or a decorated function) as phase."""
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start)
+
+
+def get_percentile(ordered, fraction):
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+def summarize(window=None):
+    """Return {phase: (p50, p95, count)}, in milliseconds.
+
+    Only the last window samples of each phase count, if window is given.
+    """
+    summary = {}
+    for phase, values in list(samples.items()):
+        ordered = sorted(values[-window:] if window else values)
+        summary[phase] = (
+            get_percentile(ordered, 0.5) * 1000,
+            get_percentile(ordered, 0.95) * 1000,
+            len(values),
+        )
+    return summary
+
+
+def report(window=None):
+    """Return a table of each phase's p50 and p95."""
+    summary = summarize(window)
+    if not summary:
+        return "No timings recorded yet"
+    width = max(len(phase) for phase in summary)
+    return "\n".join(
+        f"{phase:<{width}}  p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  n={count}"
+        for phase, (p50, p95, count) in sorted(summary.items())
+    )
+
+
+def export(path):
+    """Write every sample (in milliseconds) to path as JSON."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                phase: [seconds * 1000 for seconds in values]
+                for phase, values in samples.items()
+            },
+            file,
+            indent=2,
+        )
+        file.write("\n")
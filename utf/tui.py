@@ -0,0 +1,469 @@
+import sqlite3
+import time
+
+from textual import work
+from textual.app import App
+from textual.binding import Binding
+from textual.containers import VerticalScroll
+from textual.message import Message
+from textual.reactive import reactive
+from textual.widget import Widget
+from textual.widgets import Footer, Input, Static
+from textual.worker import get_current_worker
+
+from . import (
+    SearchSession,
+    daemon,
+    get_character_cache,
+    get_history,
+    get_search_db,
+    increment_copy_count,
+    search_lock,
+    startup,
+    timings,
+)
+
+
+def copy_to_clipboard(text):
+    # Most launches never copy anything, so don't import pyperclip upfront
+    import pyperclip
+    pyperclip.copy(text)
+
+
+class SmartScroll(VerticalScroll, can_focus=False):
+
+    class NearEnd(Message):
+        """Scrolled to within a screen of the end, so load more."""
+
+    def on_mount(self):
+        self.watch(self, "scroll_y", self.check_near_end, init=False)
+
+    def watch_show_vertical_scrollbar(self):
+        self.can_focus = self.show_vertical_scrollbar
+
+    def check_near_end(self):
+        if self.max_scroll_y - self.scroll_y < self.size.height:
+            self.post_message(self.NearEnd())
+
+    def jump_to(self, y):
+        """Scroll immediately (scroll_to waits for the next refresh)."""
+        self.scroll_y = y
+        self.scroll_target_y = self.scroll_y
+
+
+class Result(Widget):
+
+    __slots__ = ("row", "index")
+
+    BINDINGS = [
+        ("c", "copy_code", "Copy code point"),
+        ("enter", "copy_character", "Copy character"),
+        ("h", "copy_html_entity", "Copy HTML entity"),
+        ("n", "copy_name", "Copy name"),
+    ]
+
+    def __init__(self, row, index=0):
+        self.index = index
+        self.row = row
+        super().__init__()
+
+    def set_character(self, row, index):
+        """Show a different character in this (already composed) widget."""
+        self.index = index
+        if row.glyph == self.row.glyph:
+            return
+        self.row = row
+        for label, text in zip(self.children, self.get_labels()):
+            label.update(text)
+
+    def get_labels(self):
+        row = self.row
+        entity = row.entity if len(row.glyph) == 1 else ""
+        return (row.title, row.code, row.glyph, entity)
+
+    def compose(self):
+        name, code, character, entity = self.get_labels()
+        yield Static(name, classes="name")
+        yield Static(code)
+        yield Static(character)
+        yield Static(entity)
+
+    @property
+    def can_focus(self):
+        return True
+
+    def action_copy_code(self):
+        self.copy(self.row.unicode_escape)
+
+    def action_copy_character(self):
+        self.copy(self.row.glyph)
+
+    def action_copy_html_entity(self):
+        self.copy(self.row.entity)
+
+    def action_copy_name(self):
+        self.copy(self.row.named_escape, f'"{self.row.named_escape}"')
+
+    def copy(self, text, label=None):
+        with timings.timed("clipboard"):
+            copy_to_clipboard(text)
+        self.notify(f"[green]Copied[/green] {label or text}")
+        self.app.record_copy(self.row.name, self.row.glyph)
+
+    def on_click(self, event):
+        self.action_copy_character()
+
+
+class SearchBox(Input):
+
+    BINDINGS = [
+        Binding("enter", "first_result", "Select first result", priority=True),
+    ]
+
+    class Done(Message):
+        """Searching done."""
+
+    def action_first_result(self):
+        self.post_message(self.Done())
+
+
+class SearchResults(Static):
+    """Result grid that only mounts widgets for the rows in view.
+
+    Widgets are kept in a pool and rebound to different results as the
+    query changes or the user scrolls.  Rows above and below the visible
+    window are stood in for by padding, so the scrollbar stays accurate.
+    """
+
+    ROW_HEIGHT = 9  # Result height plus grid gutter
+    OVERSCAN = 1  # Extra rows mounted above and below the visible ones
+
+    results = reactive(list)
+    grid_size = reactive(1)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = []
+        self.start = 0
+
+    def on_mount(self):
+        self.watch(self.parent, "scroll_y", self.update_window, init=False)
+        self.update_window()
+
+    def watch_results(self, old_results, results):
+        if self.is_mounted:
+            # Stay put if the new results just add more to the end
+            if results[:len(old_results)] != old_results:
+                self.parent.jump_to(0)
+            self.update_window()
+
+    def watch_grid_size(self):
+        if self.is_mounted:
+            self.update_window()
+
+    def get_window(self):
+        """Return the first and last (exclusive) rows to mount."""
+        total_rows = -(-len(self.results) // self.grid_size)
+        visible_rows = self.parent.size.height // self.ROW_HEIGHT + 1
+        row = int(self.parent.scroll_y) // self.ROW_HEIGHT
+        first = max(0, row - self.OVERSCAN)
+        last = min(total_rows, row + visible_rows + self.OVERSCAN)
+        return first, last, total_rows
+
+    def update_window(self):
+        if not self.is_mounted:
+            return
+        first, last, total_rows = self.get_window()
+        start = first * self.grid_size
+        end = min(len(self.results), last * self.grid_size)
+        focused = self.app.focused
+        focused_index = focused.index if isinstance(focused, Result) else None
+        if len(self.pool) < end - start:
+            new = [
+                Result(row, index)
+                for index, row in enumerate(
+                    self.results[start+len(self.pool):end],
+                    start=start+len(self.pool),
+                )
+            ]
+            self.pool += new
+            self.mount_all(new)
+        for index, widget in enumerate(self.pool, start=start):
+            if index < end:
+                widget.set_character(self.results[index], index)
+                widget.display = True
+            else:
+                widget.display = False
+        self.start = start
+        self.styles.padding = (
+            first * self.ROW_HEIGHT,
+            0,
+            max(0, total_rows - last) * self.ROW_HEIGHT,
+            0,
+        )
+        # Keep focus on the same result even though it moved widgets
+        if focused_index is not None:
+            if start <= focused_index < end:
+                self.pool[focused_index-start].focus(scroll_visible=False)
+            else:
+                self.screen.set_focus(None)
+
+    def focus_result(self, index):
+        """Scroll to and focus the result at the given index."""
+        if not 0 <= index < len(self.results):
+            return
+        scroll = self.parent
+        top = self.styles.margin.top + index // self.grid_size * self.ROW_HEIGHT
+        bottom = top + self.ROW_HEIGHT
+        if top < scroll.scroll_y:
+            scroll.jump_to(top)
+        elif bottom > scroll.scroll_y + scroll.size.height:
+            scroll.jump_to(bottom - scroll.size.height)
+        self.update_window()
+        self.pool[index-self.start].focus(scroll_visible=False)
+
+    @property
+    def visible_count(self):
+        return sum(widget.display for widget in self.pool)
+
+
+class Timings(Static):
+    """Rolling p50/p95 of each timed phase, shown with utf --profile."""
+
+    UPDATE_INTERVAL = 0.5
+
+    def on_mount(self):
+        self.set_interval(self.UPDATE_INTERVAL, self.update_report)
+
+    def update_report(self):
+        if self.display:
+            self.update(timings.report(timings.WINDOW))
+
+
+class UnicodeApp(App):
+    """A Textual app to search Unicode characters."""
+
+    CSS_PATH = "utf.tcss"
+
+    NOTIFICATION_TIMEOUT = 10
+    SEARCH_DEBOUNCE = 0.05
+    COPY_FLUSH_INTERVAL = 5
+    BINDINGS = [
+        ("ctrl+t", "toggle_dark", "Toggle dark mode"),
+        ("ctrl+l", "clear_search", "Clear search"),
+        ("f2", "toggle_timings", "Toggle timings"),
+        Binding("up", "move_up", "Move up", priority=True, show=False),
+        Binding("down", "move_down", "Move down", priority=True, show=False),
+        Binding("left", "move_left", "Move left", show=False),
+        Binding("right", "move_right", "Move right", show=False),
+    ]
+
+    results = reactive(list)
+
+    def __init__(self, startup_profile=False):
+        super().__init__()
+        self.startup_profile = startup_profile
+
+    def compose(self):
+        """Called to add widgets to the app."""
+        yield Footer()
+        yield SearchBox(placeholder="Search for a character")
+        yield SmartScroll(
+            SearchResults(id="results").data_bind(results=UnicodeApp.results)
+        )
+        if timings.enabled:
+            yield Timings()
+
+    def check_action(self, action, parameters):
+        # The timings overlay only exists when profiling
+        return action != "toggle_timings" or timings.enabled
+
+    def action_toggle_timings(self):
+        overlay = self.query_one(Timings)
+        overlay.display = not overlay.display
+        overlay.update_report()
+
+    def action_clear_search(self):
+        self.query_one(SearchBox).focus()
+        self.query_one(SearchBox).value = ""
+
+    def clear_results(self):
+        results = self.client and self.client.history()
+        self.results = get_character_cache() if results is None else results
+        self.set_more_results(None)
+
+    def set_more_results(self, pages):
+        """Set where the pages of results after the current ones come from."""
+        self.more_results = pages
+        self.loading_more = False
+
+    def record_copy(self, name, character):
+        if not (self.client and self.client.record(name, character)):
+            increment_copy_count(name, character)
+
+    def action_move_up(self):
+        if not isinstance(self.focused, Result):
+            return
+        index = self.focused.index - self.grid_size
+        if index >= 0:
+            self.query_one(SearchResults).focus_result(index)
+        else:
+            self.query_one(SearchBox).focus()
+
+    def action_move_down(self):
+        if not isinstance(self.focused, Result):
+            self.query_one(SearchResults).focus_result(0)
+            return
+        index = self.focused.index + self.grid_size
+        self.query_one(SearchResults).focus_result(index)
+
+    def action_move_left(self):
+        if not isinstance(self.focused, Result):
+            return
+        index = self.focused.index - 1
+        if index >= 0 and (index+1) % self.grid_size > 0:
+            self.query_one(SearchResults).focus_result(index)
+
+    def action_move_right(self):
+        if not isinstance(self.focused, Result):
+            return
+        index = self.focused.index + 1
+        if index % self.grid_size > 0:
+            self.query_one(SearchResults).focus_result(index)
+
+    def on_resize(self, event):
+        if event.size.width > 200:
+            self.query_one(SearchResults).set_classes("large")
+            self.grid_size = 5
+        elif event.size.width > 150:
+            self.query_one(SearchResults).set_classes("medium")
+            self.grid_size = 4
+        elif event.size.width > 100:
+            self.query_one(SearchResults).set_classes("small")
+            self.grid_size = 3
+        elif event.size.width > 70:
+            self.query_one(SearchResults).set_classes("tiny")
+            self.grid_size = 2
+        else:
+            self.query_one(SearchResults).set_classes("")
+            self.grid_size = 1
+        results = self.query_one(SearchResults)
+        results.grid_size = self.grid_size
+        self.call_after_refresh(results.update_window)
+
+    def on_load(self):
+        # Use the search daemon (utf serve) if it's running
+        self.client = daemon.connect()
+        self.clear_results()
+        self.search_session = SearchSession(get_search_db())
+        self.set_interval(self.COPY_FLUSH_INTERVAL, get_history().flush)
+
+    def on_mount(self):
+        self.detect_dark_mode()
+        self.call_after_refresh(self.first_frame_shown)
+
+    def first_frame_shown(self):
+        startup.mark("first frame")
+        if self.startup_profile:
+            self.exit()
+
+    @work(thread=True)
+    def detect_dark_mode(self):
+        """Match the system theme without holding up the first frame."""
+        from darkdetect import isDark as is_dark
+        dark = is_dark()
+        self.call_from_thread(setattr, self, "dark", dark)
+
+    def on_search_box_done(self, message):
+        if not isinstance(self.focused, Result):
+            self.query_one(SearchResults).focus_result(0)
+            return
+
+    def on_input_changed(self, message):
+        self.changed_at = time.perf_counter()
+        # Abort any query still running for an older value
+        get_search_db().interrupt()
+        self.workers.cancel_group(self, "more")
+        if message.value:
+            self.search(message.value)
+        else:
+            self.workers.cancel_group(self, "search")
+            self.clear_results()
+
+    @work(thread=True, exclusive=True, group="search")
+    def search(self, query):
+        """Search in a worker, dropping the query if a newer one arrives."""
+        worker = get_current_worker()
+        time.sleep(self.SEARCH_DEBOUNCE)
+        if worker.is_cancelled:
+            return
+        start = time.perf_counter()
+        results = self.client and self.client.find(query)
+        pages = self.find_more(query)
+        if results is None:
+            with search_lock:
+                if worker.is_cancelled:
+                    return
+                try:
+                    pages = self.search_session.pages(query)
+                    results = next(pages)
+                except sqlite3.OperationalError:
+                    return  # Interrupted by a newer query
+        timings.record("search", time.perf_counter() - start)
+        if not worker.is_cancelled:
+            self.call_from_thread(self.show_results, query, results, pages)
+
+    def find_more(self, query):
+        """Yield the pages of results for query after the first one.
+
+        The daemon only finds the first page, so scrolling further searches
+        locally.
+        """
+        pages = self.search_session.pages(query)
+        next(pages)
+        yield from pages
+
+    def show_results(self, query, results, pages):
+        if query == self.query_one(SearchBox).value:
+            shown_at = time.perf_counter()
+            self.results = results
+            self.set_more_results(pages)
+            if timings.enabled:
+                self.call_after_refresh(self.results_rendered, shown_at)
+
+    def results_rendered(self, shown_at):
+        now = time.perf_counter()
+        timings.record("render", now - shown_at)
+        timings.record("keystroke", now - self.changed_at)
+
+    def on_smart_scroll_near_end(self, message):
+        if self.more_results is not None and not self.loading_more:
+            self.loading_more = True
+            self.load_more(self.more_results)
+
+    @work(thread=True, exclusive=True, group="more")
+    def load_more(self, pages):
+        """Find the next page of results in a worker."""
+        worker = get_current_worker()
+        with search_lock:
+            if worker.is_cancelled:
+                return
+            try:
+                page = next(pages, None)
+            except sqlite3.OperationalError:
+                return  # Interrupted by a newer query
+        if not worker.is_cancelled:
+            self.call_from_thread(self.add_results, pages, page)
+
+    def add_results(self, pages, page):
+        if pages is not self.more_results:
+            return  # For an older query
+        if page is None:
+            self.set_more_results(None)
+            return
+        self.loading_more = False
+        shown = {row.glyph for row in self.results}
+        self.results = [
+            *self.results,
+            *(row for row in page if row.glyph not in shown),
+        ]